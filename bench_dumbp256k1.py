@@ -0,0 +1,352 @@
+# Benchmarking Dumbp256k1
+#
+# Run directly: `python bench_dumbp256k1.py`
+# -- `--filter multiexp` runs only benchmarks whose names contain "multiexp"
+# -- `--quick` skips the largest inputs
+# -- `--output results.json` writes machine-readable results
+# -- `--baseline results.json` compares against saved results and exits nonzero on a regression;
+#    `--threshold 0.1` sets the allowed slowdown and `--threshold multiexp/65536=0.25` overrides it per benchmark
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+import dumbp256k1
+from dumbp256k1 import Scalar, Point, ScalarVector, PointVector, G, random_scalar
+
+
+# The original recursive double-and-add, kept as a reference point
+def recursive_mul(P, y):
+    if y == Scalar(0):
+        return Point('00')
+    Q = recursive_mul(P, y / Scalar(2))
+    Q = Q + Q
+    if y.x & 1:
+        Q = P + Q
+    return Q
+
+
+# Time a function, returning seconds per call
+# -- the call count is chosen so each repeat takes about `budget` seconds, and the best repeat wins
+def bench(fn, budget=0.2, repeat=3):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    if elapsed >= budget:
+        return elapsed
+    number = max(1, int(budget / max(elapsed, 1e-9)))
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+# Random inputs
+def random_scalars(size):
+    return ScalarVector([random_scalar() for i in range(size)])
+
+
+def random_points(size):
+    # hashing is slow, so derive the points from a few scalar multiples of G
+    return dumbp256k1.batch_mul(random_scalars(size), G, workers=1)
+
+
+# Each group of benchmarks yields (name, seconds per call) pairs for the names accepted by `select`
+def bench_field(quick, select):
+    a = random_scalar().x
+    x = G.x
+    original = dumbp256k1.backend
+    try:
+        for backend in dumbp256k1.backends:
+            dumbp256k1.set_backend(backend)
+            if select('field/{}/invert'.format(backend)):
+                yield 'field/{}/invert'.format(backend), bench(lambda: dumbp256k1.invert(a, dumbp256k1.p))
+            if select('field/{}/sqrt'.format(backend)):
+                yield 'field/{}/sqrt'.format(backend), bench(lambda: dumbp256k1.yfromx(x, True))
+    finally:
+        dumbp256k1.set_backend(original)
+
+
+def bench_scalar(quick, select):
+    x = random_scalar()
+    y = random_scalar()
+    if select('scalar/add'):
+        yield 'scalar/add', bench(lambda: x + y)
+    if select('scalar/mul'):
+        yield 'scalar/mul', bench(lambda: x * y)
+    if select('scalar/invert'):
+        yield 'scalar/invert', bench(lambda: x.invert())
+    if select('scalar/pow'):
+        yield 'scalar/pow', bench(lambda: x ** 1000)
+
+
+def bench_point(quick, select):
+    P = dumbp256k1.random_point()
+    Q = dumbp256k1.random_point()
+    J = dumbp256k1.jacobian_double(dumbp256k1.to_jacobian(P))
+    if select('point/add'):
+        yield 'point/add', bench(lambda: P + Q)
+    if select('point/sub'):
+        yield 'point/sub', bench(lambda: P - Q)
+    if select('point/double'):
+        yield 'point/double', bench(lambda: P + P)
+    if select('point/jacobian_add'):
+        yield 'point/jacobian_add', bench(lambda: dumbp256k1.jacobian_add(J, J))
+    if select('point/jacobian_add_affine'):
+        yield 'point/jacobian_add_affine', bench(lambda: dumbp256k1.jacobian_add_affine(J, (Q.x, Q.y)))
+    if select('point/jacobian_double'):
+        yield 'point/jacobian_double', bench(lambda: dumbp256k1.jacobian_double(J))
+
+
+def bench_scalar_mul(quick, select):
+    k = random_scalar()
+    P = dumbp256k1.random_point()
+    if select('scalar_mul/recursive'):
+        yield 'scalar_mul/recursive', bench(lambda: recursive_mul(P, k))
+    for width in range(2, 9):
+        if select(f'scalar_mul/variable/w{width}'):
+            yield f'scalar_mul/variable/w{width}', bench(lambda: dumbp256k1.scalar_mul(P, k, width, False))
+        if select(f'scalar_mul/variable/glv/w{width}'):
+            yield f'scalar_mul/variable/glv/w{width}', bench(lambda: dumbp256k1.scalar_mul(P, k, width, True))
+    if select('scalar_mul/variable'):
+        yield 'scalar_mul/variable', bench(lambda: k * P)
+    dumbp256k1.fixed_base_table(G)   # build the table outside of the timing
+    if select('scalar_mul/fixed'):
+        yield 'scalar_mul/fixed', bench(lambda: k * G)
+
+
+def bench_multiexp(quick, select):
+    sizes = [1, 4, 16, 64, 256, 1024] if quick else [1, 4, 16, 64, 256, 1024, 4096, 16384, 65536]
+    for size in sizes:
+        if not select(f'multiexp/{size}'):
+            continue
+        svector = random_scalars(size)
+        pvector = random_points(size)
+        yield f'multiexp/{size}', bench(lambda: svector ** pvector)
+    for size in [256, 4096] if quick else [256, 4096, 65536]:
+        if not select(f'multiexp_stream/{size}'):
+            continue
+        chunks = [(random_scalars(256), random_points(256)) for i in range(size // 256)]
+        yield f'multiexp_stream/{size}', bench(lambda: dumbp256k1.multiexp_stream(chunks))
+    # equations sharing their bases, checked one by one and in a batch
+    for count in [16, 128]:
+        if not select(f'verify/separate/{count}x32') and not select(f'verify/batch/{count}x32'):
+            continue
+        bases = random_points(32)
+        equations = []
+        for i in range(count):
+            svector = random_scalars(32)
+            equations.append((svector, bases, svector ** bases))
+        if select(f'verify/separate/{count}x32'):
+            yield f'verify/separate/{count}x32', bench(lambda: all(s ** P == R for s, P, R in equations))
+        if select(f'verify/batch/{count}x32'):
+            yield f'verify/batch/{count}x32', bench(lambda: dumbp256k1.batch_verify(equations))
+
+
+def bench_multiexp_algorithms(quick, select):
+    width = dumbp256k1.wnaf_width
+    for size in [1, 2, 4, 8, 16, 32, 48, 64, 128]:
+        if not any(select(f'multiexp_algorithm/{name}/{size}') for name in ['naive', 'straus', 'pippenger']):
+            continue
+        scalars = random_scalars(size).xs
+        points = random_points(size).affine()
+        if select(f'multiexp_algorithm/naive/{size}'):
+            yield f'multiexp_algorithm/naive/{size}', bench(lambda: dumbp256k1.naive_multiexp(scalars, points, width, True))
+        if select(f'multiexp_algorithm/straus/{size}'):
+            yield f'multiexp_algorithm/straus/{size}', bench(lambda: dumbp256k1.straus(scalars, points, width, True))
+        if select(f'multiexp_algorithm/pippenger/{size}'):
+            yield f'multiexp_algorithm/pippenger/{size}', bench(lambda: dumbp256k1.pippenger(*dumbp256k1.glv_expand(scalars, points)))
+
+
+def bench_multiexp_context(quick, select):
+    for size in [16, 64, 256] if quick else [16, 64, 256, 1024]:
+        if not select(f'multiexp_context/{size}'):
+            continue
+        svector = random_scalars(size)
+        context = dumbp256k1.MultiexpContext(random_points(size))
+        yield f'multiexp_context/{size}', bench(lambda: svector ** context)
+
+
+def bench_parallel(quick, select):
+    size = 4096
+    if quick or not (select(f'parallel_multiexp/{size}') or select(f'batch_mul/{size}')):
+        return
+    svector = random_scalars(size)
+    pvector = random_points(size)
+    if select(f'parallel_multiexp/{size}'):
+        yield f'parallel_multiexp/{size}', bench(lambda: dumbp256k1.parallel_multiexp(svector, pvector))
+    if select(f'batch_mul/{size}'):
+        yield f'batch_mul/{size}', bench(lambda: dumbp256k1.batch_mul(svector, pvector))
+
+
+def bench_vectors(quick, select):
+    size = 1000
+    names = [f'scalarvector/{name}/{size}' for name in ['invert', 'inner_product', 'powers', 'evaluate']]
+    names += [f'pointvector/{name}/{size}' for name in ['add', 'sub', 'sum', 'sum/loop', 'mul', 'hadamard_multiexp/eager', 'hadamard_multiexp/lazy']]
+    names += [f'batch_mul/G/{size}']
+    selected = [name for name in names if select(name)]
+    if not selected:
+        return
+    svector = random_scalars(size)
+    if any(name.startswith('pointvector/') for name in selected):
+        left = random_points(size)
+        right = random_points(size)
+    if select(f'scalarvector/invert/{size}'):
+        yield f'scalarvector/invert/{size}', bench(lambda: svector.invert())
+    if select(f'scalarvector/inner_product/{size}'):
+        yield f'scalarvector/inner_product/{size}', bench(lambda: svector ** svector)
+    x = random_scalar()
+    if select(f'scalarvector/powers/{size}'):
+        yield f'scalarvector/powers/{size}', bench(lambda: ScalarVector.powers(x, size))
+    if select(f'scalarvector/evaluate/{size}'):
+        yield f'scalarvector/evaluate/{size}', bench(lambda: svector.evaluate(x))
+    if select(f'pointvector/add/{size}'):
+        yield f'pointvector/add/{size}', bench(lambda: left + right)
+    if select(f'pointvector/sub/{size}'):
+        yield f'pointvector/sub/{size}', bench(lambda: left - right)
+    if select(f'pointvector/sum/{size}'):
+        yield f'pointvector/sum/{size}', bench(lambda: left.sum())
+    if select(f'pointvector/sum/loop/{size}'):
+        yield f'pointvector/sum/loop/{size}', bench(lambda: sum(left.points, Point('00')))
+    if select(f'pointvector/mul/{size}'):
+        yield f'pointvector/mul/{size}', bench(lambda: left * svector)
+    if select(f'batch_mul/G/{size}'):
+        yield f'batch_mul/G/{size}', bench(lambda: dumbp256k1.batch_mul(svector, G, workers=1))
+
+    # svector ** (svector * left), with the Hadamard product computed or folded into the multiexp
+    def hadamard_multiexp(lazy):
+        dumbp256k1.lazy = lazy
+        try:
+            return svector ** (svector * left)
+        finally:
+            dumbp256k1.lazy = False
+    for mode, lazy in [('eager', False), ('lazy', True)]:
+        if select(f'pointvector/hadamard_multiexp/{mode}/{size}'):
+            yield f'pointvector/hadamard_multiexp/{mode}/{size}', bench(lambda: hadamard_multiexp(lazy))
+
+
+def bench_hashing(quick, select):
+    def uncached():
+        dumbp256k1.hash_cache.clear()
+        return dumbp256k1.hash_to_point('bench', 1)
+    if select('hash_to_point'):
+        yield 'hash_to_point', bench(uncached)
+    if select('hash_to_point/cached'):
+        yield 'hash_to_point/cached', bench(lambda: dumbp256k1.hash_to_point('bench', 1))
+    if select('hash_to_scalar'):
+        yield 'hash_to_scalar', bench(lambda: dumbp256k1.hash_to_scalar('bench', 1))
+
+    def transcript():
+        t = dumbp256k1.Transcript('bench')
+        t.absorb(*[G] * 16)
+        return t.challenge()
+    if select('transcript/16'):
+        yield 'transcript/16', bench(transcript)
+
+
+def bench_encoding(quick, select):
+    size = 1000
+    names = [f'{name}/{size}' for name in ['encoding/scalars', 'decoding/scalars', 'encoding/points', 'decoding/points/hex',
+                                           'decoding/points/compressed', 'decoding/points/uncompressed']]
+    if not any(select(name) for name in names):
+        return
+    svector = random_scalars(size)
+    pvector = random_points(size)
+    hexes = [repr(P) for P in pvector.points]
+    compressed = pvector.to_bytes()
+    uncompressed = pvector.to_bytes(compressed=False)
+    scalars = svector.to_bytes()
+    if select(f'encoding/scalars/{size}'):
+        yield f'encoding/scalars/{size}', bench(lambda: svector.to_bytes())
+    if select(f'decoding/scalars/{size}'):
+        yield f'decoding/scalars/{size}', bench(lambda: ScalarVector.from_bytes(scalars))
+    if select(f'encoding/points/{size}'):
+        yield f'encoding/points/{size}', bench(lambda: pvector.to_bytes())
+    if select(f'decoding/points/hex/{size}'):
+        yield f'decoding/points/hex/{size}', bench(lambda: PointVector([Point(h) for h in hexes]))
+    if select(f'decoding/points/compressed/{size}'):
+        yield f'decoding/points/compressed/{size}', bench(lambda: PointVector.from_bytes(compressed))
+    if select(f'decoding/points/uncompressed/{size}'):
+        yield f'decoding/points/uncompressed/{size}', bench(lambda: PointVector.from_bytes(uncompressed, False))
+
+
+BENCHMARKS = [
+    bench_field,
+    bench_scalar,
+    bench_point,
+    bench_scalar_mul,
+    bench_multiexp,
+    bench_multiexp_algorithms,
+    bench_multiexp_context,
+    bench_parallel,
+    bench_vectors,
+    bench_hashing,
+    bench_encoding,
+]
+
+
+# Run all benchmarks whose names contain `pattern`, printing and returning the results
+def run(pattern='', quick=False):
+    results = {}
+    for benchmark in BENCHMARKS:
+        for name, seconds in benchmark(quick, lambda name: pattern in name):
+            results[name] = seconds
+            print(f'{name:<45} {seconds * 1e6:14.1f} us', flush=True)
+    return results
+
+
+# Parse threshold options into a default and per-benchmark overrides
+def parse_thresholds(options):
+    default = 0.1
+    overrides = {}
+    for option in options:
+        if '=' in option:
+            name, value = option.rsplit('=', 1)
+            overrides[name] = float(value)
+        else:
+            default = float(option)
+    return default, overrides
+
+
+# Compare results against a baseline, returning the names of regressed benchmarks
+# -- a benchmark regresses if it is slower than its baseline by more than its threshold (a fraction)
+def compare(results, baseline, default=0.1, overrides=None):
+    if overrides is None:
+        overrides = {}
+    regressions = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        ratio = seconds / baseline[name]
+        threshold = overrides.get(name, default)
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        print(f'{name:<45} {ratio:8.2f}x baseline{"   REGRESSION" if regressed else ""}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Dumbp256k1')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose names contain this')
+    parser.add_argument('--quick', action='store_true', help='skip the largest inputs')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against results in this JSON file')
+    parser.add_argument('--threshold', action='append', default=[],
+                        help='allowed slowdown as a fraction (default 0.1), or NAME=FRACTION for one benchmark')
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.quick)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'results': results}, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        default, overrides = parse_thresholds(args.threshold)
+        if compare(results, baseline, default, overrides):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
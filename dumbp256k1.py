@@ -4,7 +4,15 @@
 # -- putting this code into production would be dumb
 # -- assuming this code is secure would also be dumb
 
+import asyncio
+import functools
+import mmap
+import os
 import secrets
+import sys
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from hashlib import blake2s
 
 
@@ -14,24 +22,422 @@ n = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
 cofactor = 1
 b = 256   # bit length
 
+# Endomorphism parameters: (x, y) -> (beta * x, y) acts as multiplication by lam
+beta = 0x7AE96A2B657C07106E64479EAC3434E99CF0497512F58995C1396C28719501EE
+lam = 0x5363AD4CC05C30E0A5261C028812645A122E22EA20816678DF02967C1B23BD72
+
+# Short lattice basis {(a1, b1), (a2, b2)} used to split scalars for the endomorphism
+a1 = 0x3086D221A7D46BCDE86C90E49284EB15
+b1 = -0xE4437ED6010E88286F547FA90ABFE4C3
+a2 = 0x114CA50F7A8E2F3F657C1108D9D44CFD8
+b2 = 0x3086D221A7D46BCDE86C90E49284EB15
+
+
+# Field-arithmetic backends
+# -- a backend provides the expensive modular operations on Python ints: `invert(a, m)` and `powmod(a, e, m)`
+# -- cheap operations (additions, multiplications and `% p`) stay inline on Python ints everywhere
+# -- 'python' uses the built-in pow, which inverts with the extended Euclidean algorithm
+# -- 'gmpy2' uses the GMP library, if it is installed
+# -- the backend named by the DUMBP256K1_BACKEND environment variable is selected at import if available,
+#    otherwise 'gmpy2' if it is installed and 'python' if not; `set_backend` changes it
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+def python_invert(a, m):
+    return pow(a, -1, m)
+
+
+def python_powmod(a, e, m):
+    return pow(a, e, m)
+
+
+backends = {'python': (python_invert, python_powmod)}
+if gmpy2 is not None:
+    backends['gmpy2'] = (lambda a, m: int(gmpy2.invert(a, m)), lambda a, e, m: int(gmpy2.powmod(a, e, m)))
+
+
+# Select a backend by name
+def set_backend(name):
+    global backend, backend_invert, backend_powmod
+    if name not in backends:
+        raise ValueError
+    backend = name
+    backend_invert, backend_powmod = backends[name]
+
+
+backend = os.environ.get('DUMBP256K1_BACKEND')
+set_backend(backend if backend in backends else 'gmpy2' if gmpy2 is not None else 'python')
+
 
 # Internal helper methods
 def invert(a, p):
-    # Assumes `p` is prime
-    return pow(a, p - 2, p)
+    # Assumes `p` is prime; raises ZeroDivisionError if `p` divides `a`, whatever the backend
+    if a % p == 0:
+        raise ZeroDivisionError
+    return backend_invert(a, p)
+
+
+# Invert many nonzero values at once with Montgomery's trick (one inversion in total)
+def invert_batch(values, p):
+    m = len(values)
+    scratch = [1] * m
+    acc = 1
+    for i in range(m):
+        scratch[i] = acc
+        acc = acc * values[i] % p
+    acc = invert(acc, p)
+    result = [0] * m
+    for i in range(m - 1, -1, -1):
+        result[i] = acc * scratch[i] % p
+        acc = acc * values[i] % p
+    return result
 
 
 def yfromx(x, even):
     # even determines even or odd y
     # this has no quadratic residue check
-    y = pow(x * x * x + 7, (p + 1) // 4, p)
+    y = backend_powmod((x * x * x + 7) % p, (p + 1) // 4, p)
     if (y % 2 != 0 and even) or (y % 2 == 0 and not even):
         y = p - y
     return y
 
 
+# Encode affine coordinates as 02/03 || x (compressed) or 04 || x || y (uncompressed)
+def encode_point(x, y, compressed):
+    if compressed:
+        return bytes([3 if y & 1 else 2]) + x.to_bytes(b // 8, 'big')
+    return bytes([4]) + x.to_bytes(b // 8, 'big') + y.to_bytes(b // 8, 'big')
+
+
+# Decode and validate one encoded point from a buffer, returning an affine pair
+# -- a leading 00 followed only by zeros is the point at infinity (0, 0)
+def decode_point(data):
+    prefix = data[0]
+    if prefix == 0:
+        if any(data[1:]):
+            raise ValueError
+        return (0, 0)
+    if prefix in (2, 3) and len(data) == b // 8 + 1:
+        x = int.from_bytes(data[1:], 'big')
+        if x >= p:
+            raise ValueError
+        y = yfromx(x, prefix == 2)
+    elif prefix == 4 and len(data) == b // 4 + 1:
+        x = int.from_bytes(data[1:b // 8 + 1], 'big')
+        y = int.from_bytes(data[b // 8 + 1:], 'big')
+        if x >= p or y >= p:
+            raise ValueError
+    else:
+        raise ValueError
+    if (y * y - x * x * x - 7) % p != 0:
+        raise ValueError
+    return (x, y)
+
+
+# Jacobian projective coordinates
+# -- a triple (X, Y, Z) represents the affine point (X / Z^2, Y / Z^3)
+# -- the point at infinity is any triple with Z = 0
+# -- these are used internally so that chained arithmetic needs no inversions
+J_INF = (1, 1, 0)
+
+
+# Convert an affine Point to Jacobian coordinates
+def to_jacobian(P):
+    if P.x == P.y == 0:
+        return J_INF
+    return (P.x, P.y, 1)
+
+
+# Convert Jacobian coordinates back to an affine Point (one inversion)
+def from_jacobian(P):
+    X, Y, Z = P
+    if Z == 0:
+        return Point.unchecked(0, 0)
+    z = invert(Z, p)
+    zz = z * z % p
+    return Point.unchecked(X * zz % p, Y * zz * z % p)
+
+
+# Jacobian negation
+def jacobian_neg(P):
+    return (P[0], p - P[1], P[2])
+
+
+# Jacobian doubling (dbl-2009-l, for a = 0)
+def jacobian_double(P):
+    X1, Y1, Z1 = P
+    if Z1 == 0 or Y1 == 0:
+        return J_INF
+    A = X1 * X1 % p
+    B = Y1 * Y1 % p
+    C = B * B % p
+    D = 2 * ((X1 + B) * (X1 + B) - A - C) % p
+    E = 3 * A
+    X3 = (E * E - 2 * D) % p
+    Y3 = (E * (D - X3) - 8 * C) % p
+    Z3 = 2 * Y1 * Z1 % p
+    return (X3, Y3, Z3)
+
+
+# Jacobian addition (add-1998-cmo-2)
+def jacobian_add(P, Q):
+    X1, Y1, Z1 = P
+    X2, Y2, Z2 = Q
+    if Z1 == 0:
+        return Q
+    if Z2 == 0:
+        return P
+    Z1Z1 = Z1 * Z1 % p
+    Z2Z2 = Z2 * Z2 % p
+    U1 = X1 * Z2Z2 % p
+    U2 = X2 * Z1Z1 % p
+    S1 = Y1 * Z2 * Z2Z2 % p
+    S2 = Y2 * Z1 * Z1Z1 % p
+    H = (U2 - U1) % p
+    R = (S2 - S1) % p
+    if H == 0:
+        if R == 0:   # P + P
+            return jacobian_double(P)
+        return J_INF   # P + (-P)
+    HH = H * H % p
+    HHH = H * HH % p
+    V = U1 * HH % p
+    X3 = (R * R - HHH - 2 * V) % p
+    Y3 = (R * (V - X3) - S1 * HHH) % p
+    Z3 = H * Z1 * Z2 % p
+    return (X3, Y3, Z3)
+
+
+# Mixed Jacobian-affine addition, where `Q` is an affine pair (x, y)
+def jacobian_add_affine(P, Q):
+    X1, Y1, Z1 = P
+    x2, y2 = Q
+    if x2 == y2 == 0:
+        return P
+    if Z1 == 0:
+        return (x2, y2, 1)
+    Z1Z1 = Z1 * Z1 % p
+    U2 = x2 * Z1Z1 % p
+    S2 = y2 * Z1 * Z1Z1 % p
+    H = (U2 - X1) % p
+    R = (S2 - Y1) % p
+    if H == 0:
+        if R == 0:   # P + P
+            return jacobian_double(P)
+        return J_INF   # P + (-P)
+    HH = H * H % p
+    HHH = H * HH % p
+    V = X1 * HH % p
+    X3 = (R * R - HHH - 2 * V) % p
+    Y3 = (R * (V - X3) - Y1 * HHH) % p
+    Z3 = Z1 * H % p
+    return (X3, Y3, Z3)
+
+
+# Normalize many Jacobian points to affine pairs (x, y) with a single inversion
+# -- the point at infinity becomes (0, 0)
+def jacobian_to_affine_batch(points):
+    finite = [P for P in points if P[2] != 0]
+    inverses = iter(invert_batch([P[2] for P in finite], p))
+    result = []
+    for X, Y, Z in points:
+        if Z == 0:
+            result.append((0, 0))
+            continue
+        z = next(inverses)
+        zz = z * z % p
+        result.append((X * zz % p, Y * zz * z % p))
+    return result
+
+
+# Add many pairs of affine pairs elementwise, sharing a single inversion
+# -- the point at infinity is (0, 0)
+def affine_add_batch(Ps, Qs):
+    # first pass: find each slope's denominator, or the result directly for special cases
+    results = [None] * len(Ps)
+    denominators = []
+    for i in range(len(Ps)):
+        x1, y1 = Ps[i]
+        x2, y2 = Qs[i]
+        if x1 == y1 == 0:   # Z + Q = Q
+            results[i] = Qs[i]
+        elif x2 == y2 == 0:   # P + Z = P
+            results[i] = Ps[i]
+        elif x1 == x2:
+            if y1 == y2 and y1 != 0:   # P + P
+                denominators.append(2 * y1 % p)
+            else:   # P + (-P) = Z
+                results[i] = (0, 0)
+        else:
+            denominators.append((x2 - x1) % p)
+    inverses = iter(invert_batch(denominators, p))
+
+    # second pass: finish the remaining additions
+    for i in range(len(Ps)):
+        if results[i] is not None:
+            continue
+        x1, y1 = Ps[i]
+        x2, y2 = Qs[i]
+        if x1 == x2:
+            s = 3 * x1 * x1 * next(inverses) % p
+        else:
+            s = (y2 - y1) * next(inverses) % p
+        x3 = (s * s - x1 - x2) % p
+        y3 = (s * (x1 - x3) - y1) % p
+        results[i] = (x3, y3)
+    return results
+
+
+# Sum each of several lists of affine pairs by pairwise reduction in a tree
+# -- every level of every list shares a single inversion, so n points cost about log2(n) inversions
+def affine_sum_batch(lists):
+    lists = [list(points) for points in lists]
+    while any(len(points) > 1 for points in lists):
+        Ps = []
+        Qs = []
+        for points in lists:
+            Ps.extend(points[0:len(points) - 1:2])
+            Qs.extend(points[1::2])
+        sums = iter(affine_add_batch(Ps, Qs))
+        for i, points in enumerate(lists):
+            reduced = [next(sums) for j in range(len(points) // 2)]
+            if len(points) % 2 == 1:
+                reduced.append(points[-1])
+            lists[i] = reduced
+    return [points[0] if points else (0, 0) for points in lists]
+
+
+# Signed base-2^c digits of a nonnegative integer, least significant first, each in (-2^(c - 1), 2^(c - 1)]
+# -- stops once the rest of the integer is zero, so there may be one more digit than the unsigned form has
+def signed_digits(k, c):
+    full = 1 << c
+    half = full >> 1
+    mask = full - 1
+    while k:
+        d = k & mask
+        k >>= c
+        if d > half:
+            d -= full
+            k += 1
+        yield d
+
+
+# Sum Jacobian buckets weighted by their index: the sum of d * buckets[d] for d >= 1 (bucket 0 is ignored)
+# -- a running sum from the top bucket down, adding the running sum to the total at each step
+def sum_buckets(buckets):
+    pail = J_INF
+    total = J_INF
+    for d in range(len(buckets) - 1, 0, -1):
+        pail = jacobian_add(pail, buckets[d])
+        total = jacobian_add(total, pail)
+    return total
+
+
+# Width-w non-adjacent form of a nonnegative integer, least significant digit first
+# -- every nonzero digit is odd with absolute value below 2^(w - 1)
+# -- any w consecutive digits contain at most one nonzero digit
+def wnaf(k, width):
+    full = 1 << width
+    half = full >> 1
+    digits = []
+    while k:
+        if k & 1:
+            d = k & (full - 1)
+            if d >= half:
+                d -= full
+            k -= d
+        else:
+            d = 0
+        digits.append(d)
+        k >>= 1
+    return digits
+
+
+# Odd multiples P, 3P, ..., (2^(w - 1) - 1)P of a Jacobian point, as affine pairs
+def odd_multiples(P, width):
+    return odd_multiples_batch([P], width)[0]
+
+
+# Odd multiples of many Jacobian points, sharing a single inversion
+def odd_multiples_batch(points, width):
+    size = 1 << (width - 2)
+    multiples = []
+    for P in points:
+        multiples.append(P)
+        double = jacobian_double(P)
+        for i in range(size - 1):
+            multiples.append(jacobian_add(multiples[-1], double))
+    multiples = jacobian_to_affine_batch(multiples)
+    return [multiples[i * size:(i + 1) * size] for i in range(len(points))]
+
+
+# Interleaved wNAF multiplication, returning Jacobian coordinates
+# -- each term is (table, k) with `table` from `odd_multiples` and `k` a (possibly negative) integer
+# -- all terms share a single chain of doublings
+def interleaved_wnaf(terms):
+    terms = [(table, k) for table, k in terms if k != 0]
+    if len(terms) == 0:
+        return J_INF
+    expanded = []
+    for table, k in terms:
+        negated = [(x, p - y) for x, y in table]
+        if k < 0:
+            table, negated, k = negated, table, -k
+        expanded.append((wnaf(k, len(table).bit_length() + 1), table, negated))
+
+    Q = J_INF
+    for i in range(max(len(digits) for digits, _, _ in expanded) - 1, -1, -1):
+        Q = jacobian_double(Q)
+        for digits, table, negated in expanded:
+            if i >= len(digits):
+                continue
+            d = digits[i]
+            if d > 0:
+                Q = jacobian_add_affine(Q, table[d >> 1])
+            elif d < 0:
+                Q = jacobian_add_affine(Q, negated[-d >> 1])
+    return Q
+
+
+# Split an integer k into (k1, k2), each about half as long, with k = k1 + k2 * lam (mod n)
+def glv_split(k):
+    c1 = (2 * b2 * k + n) // (2 * n)   # round(b2 * k / n)
+    c2 = (-2 * b1 * k + n) // (2 * n)   # round(-b1 * k / n)
+    k1 = k - c1 * a1 - c2 * a2
+    k2 = -c1 * b1 - c2 * b2
+    return k1, k2
+
+
+# Apply the endomorphism to an affine pair
+def endomorphism(P):
+    return (beta * P[0] % p, P[1])
+
+
+# Variable-base scalar multiplication of an affine pair by an integer using a width-w NAF
+# -- with `split`, the scalar is split with the endomorphism so that the doublings are halved
+# -- returns Jacobian coordinates
+def wnaf_mul(P, k, width, split=False):
+    if k == 0 or P == (0, 0):
+        return J_INF
+    table = odd_multiples((P[0], P[1], 1), width)
+    if not split:
+        return interleaved_wnaf([(table, k)])
+    k1, k2 = glv_split(k)
+    return interleaved_wnaf([(table, k1), ([endomorphism(Q) for Q in table], k2)])
+
+
+# Re-validate every Scalar and Point built by the library's own arithmetic
+# -- external inputs are always validated; this is only for debugging the arithmetic itself
+debug = False
+
+
 # An element of the main subgroup scalar field
 class Scalar:
+    __slots__ = ('x',)
+
     def __init__(self, x):
         # Generated from an integer value
         if isinstance(x, int):
@@ -45,33 +451,42 @@ class Scalar:
         else:
             raise TypeError
 
+    # Trusted fast path for internal results: `x` must already be reduced modulo n
+    @classmethod
+    def unchecked(cls, x):
+        s = object.__new__(cls)
+        s.x = x
+        if debug and not 0 <= x < n:
+            raise ValueError
+        return s
+
     # Multiplicative inversion, with an option to let 1/0 = 0 if you're into that
     def invert(self, allow_zero=False):
         if self.x == 0:
             if allow_zero:
-                return Scalar(0)
+                return Scalar.unchecked(0)
             else:
                 raise ZeroDivisionError
-        return Scalar(invert(self.x, n))
+        return Scalar.unchecked(invert(self.x, n))
 
     # Addition
     def __add__(self, y):
         if isinstance(y, Scalar):
-            return Scalar(self.x + y.x)
+            return Scalar.unchecked((self.x + y.x) % n)
         return NotImplemented
 
     # Subtraction
     def __sub__(self, y):
         if isinstance(y, Scalar):
-            return Scalar(self.x - y.x)
+            return Scalar.unchecked((self.x - y.x) % n)
         return NotImplemented
 
     # Multiplication (possibly by an integer)
     def __mul__(self, y):
         if isinstance(y, int):
-            return Scalar(self.x * y)
+            return Scalar.unchecked(self.x * y % n)
         if isinstance(y, Scalar):
-            return Scalar(self.x * y.x)
+            return Scalar.unchecked(self.x * y.x % n)
         return NotImplemented
 
     def __rmul__(self, y):
@@ -82,15 +497,15 @@ class Scalar:
     # Truncated division (possibly by a positive integer)
     def __truediv__(self, y):
         if isinstance(y, int) and y >= 0:
-            return Scalar(self.x // y)
+            return Scalar.unchecked(self.x // y)
         if isinstance(y, Scalar):
-            return Scalar(self.x // y.x)
+            return Scalar.unchecked(self.x // y.x)
         raise NotImplemented
 
-    # Integer exponentiation
+    # Integer exponentiation (modular, so intermediates stay small)
     def __pow__(self, y):
         if isinstance(y, int) and y >= 0:
-            return Scalar(self.x ** y)
+            return Scalar.unchecked(pow(self.x, y, n))
         return NotImplemented
 
     # Equality
@@ -133,6 +548,22 @@ class Scalar:
     def __repr__(self):
         return f'{self.x:0{b // 4}x}'
 
+    # Binary representation (32 bytes, big-endian)
+    def to_bytes(self):
+        return self.x.to_bytes(b // 8, 'big')
+
+    # Generated from a binary representation (any bytes-like object)
+    # -- only the canonical encoding is accepted: values of at least n are rejected rather than reduced
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        if len(data) != b // 8:
+            raise ValueError
+        x = int.from_bytes(data, 'big')
+        if x >= n:
+            raise ValueError
+        return cls.unchecked(x)
+
     # Return underlying integer
     def __int__(self):
         return self.x
@@ -140,18 +571,20 @@ class Scalar:
     # Modulus (possibly by an integer)
     def __mod__(self, mod):
         if isinstance(mod, int) and mod > 0:
-            return Scalar(self.x % mod)
-        if isinstance(mod, Scalar) and mod != Scalar(0):
-            return Scalar(self.x % mod.x)
+            return Scalar.unchecked(self.x % mod)
+        if isinstance(mod, Scalar) and mod.x != 0:
+            return Scalar.unchecked(self.x % mod.x)
         return NotImplemented
 
     # Negation
     def __neg__(self):
-        return Scalar(-self.x)
+        return Scalar.unchecked(-self.x % n)
 
 
 # An element of the curve group
 class Point:
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y=None):
         # Generated from integer values
         if isinstance(x, int) and isinstance(y, int) and y is not None:
@@ -184,6 +617,17 @@ class Point:
         else:
             raise TypeError
 
+    # Trusted fast path for internal results: `x` and `y` must already be reduced modulo p
+    # -- (0, 0) is the point at infinity
+    @classmethod
+    def unchecked(cls, x, y):
+        P = object.__new__(cls)
+        P.x = x
+        P.y = y
+        if debug and not x == y == 0 and not P.on_curve():
+            raise ValueError
+        return P
+
     # Equality
     def __eq__(self, Q):
         if isinstance(Q, Point):
@@ -204,7 +648,7 @@ class Point:
             elif Q.x == Q.y == 0:   # P + Z = P
                 return self
             elif self.x == Q.x and self.y == p - Q.y:   # Q + (-Q) = Z
-                return Point('00')
+                return Point.unchecked(0, 0)
             else:
                 x1 = self.x
                 y1 = self.y
@@ -214,9 +658,9 @@ class Point:
                     s = 3 * x1 * x1 * invert(2 * y1, p)
                 else:
                     s = (y2 - y1) * invert(x2 - x1, p)
-                x3 = s * s - x1 - x2
-                y3 = s * (x1 - x3) - y1
-                return Point(x3, y3)
+                x3 = (s * s - x1 - x2) % p
+                y3 = (s * (x1 - x3) - y1) % p
+                return Point.unchecked(x3, y3)
         return NotImplemented
 
     # Subtraction
@@ -227,7 +671,7 @@ class Point:
             elif Q.x == Q.y == 0:   # P - Z = P
                 return self
             elif self == Q:   # Q - Q = Z
-                return Point('00')
+                return Point.unchecked(0, 0)
             else:
                 x1 = self.x
                 y1 = self.y
@@ -237,22 +681,16 @@ class Point:
                     s = 3 * x1 * x1 * invert(2 * y1, p)
                 else:
                     s = (y2 - y1) * invert(x2 - x1, p)
-                x3 = s * s - x1 - x2
-                y3 = s * (x1 - x3) - y1
-                return Point(x3, y3)
+                x3 = (s * s - x1 - x2) % p
+                y3 = (s * (x1 - x3) - y1) % p
+                return Point.unchecked(x3, y3)
         return NotImplemented
 
     # Multiplication
     def __mul__(self,y):
         # Point-Scalar: scalar multiplication
         if isinstance(y, Scalar):
-            if y == Scalar(0):
-                return Point('00')
-            Q = self.__mul__(y / Scalar(2))
-            Q = Q.__add__(Q)
-            if y.x & 1:
-                Q = self.__add__(Q)
-            return Q
+            return from_jacobian(jacobian_mul((self.x, self.y), y.x))
         return NotImplemented
 
     def __rmul__(self, y):
@@ -271,6 +709,20 @@ class Point:
         else:
             return f'03{self.x:0{b // 4}x}'
 
+    # Binary representation: 33 bytes compressed or 65 bytes uncompressed, or 00 for the point at infinity
+    def to_bytes(self, compressed=True):
+        if self.x == self.y == 0:
+            return bytes(1)
+        return encode_point(self.x, self.y, compressed)
+
+    # Generated from a binary representation (any bytes-like object)
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        if len(data) not in (1, 33, 65):
+            raise ValueError
+        return cls.unchecked(*decode_point(data))
+
     # Curve membership
     def on_curve(self):
         x = self.x
@@ -281,51 +733,94 @@ class Point:
     def __neg__(self):
         if self.x == self.y == 0:
             return self
-        return Point(self.x, -self.y)
+        return Point.unchecked(self.x, p - self.y)
+
+
+# A list that raises TypeError on any change in place
+# -- used for the contents of a vector built on demand, where a change would otherwise be silently lost
+class ReadOnlyList(list):
+    def refuse(self, *args, **kwargs):
+        raise TypeError
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = refuse
+    append = extend = insert = pop = remove = clear = sort = reverse = refuse
 
 
 # A vector of Points with superpowers
+# -- stored as columns of raw affine coordinates, with (0, 0) as the point at infinity
+# -- Point objects are only built on indexing
 class PointVector:
     def __init__(self, points=None):
-        if points is None:
-            points = []
+        points = [] if points is None else list(points)
         for point in points:
             if not isinstance(point, Point):
                 raise TypeError
-        self.points = points
+        self.xs = [P.x for P in points]
+        self.ys = [P.y for P in points]
+
+    # Build from coordinate columns, which must already be valid curve points
+    @classmethod
+    def from_columns(cls, xs, ys):
+        W = cls.__new__(cls)
+        W.xs = xs
+        W.ys = ys
+        return W
+
+    # Build from affine pairs, with (0, 0) as the point at infinity
+    @classmethod
+    def from_affine(cls, pairs):
+        return cls.from_columns([P[0] for P in pairs], [P[1] for P in pairs])
+
+    # Build from Jacobian triples, normalizing with a single inversion
+    @classmethod
+    def from_jacobian(cls, points):
+        return cls.from_affine(jacobian_to_affine_batch(points))
+
+    # Affine pairs
+    def affine(self):
+        return list(zip(self.xs, self.ys))
+
+    # Underlying Points (built on demand)
+    # -- a new read-only list on every access: change the vector with indexing, `append` or `extend`
+    @property
+    def points(self):
+        return ReadOnlyList(Point.unchecked(x, y) for x, y in zip(self.xs, self.ys))
 
     # Equality
     def __eq__(self, W):
         if isinstance(W, PointVector):
-            return self.points == W.points
+            return self.xs == W.xs and self.ys == W.ys
         raise TypeError
 
     # Inequality
     def __ne__(self, W):
         if isinstance(W, PointVector):
-            return self.points != W.points
+            return self.xs != W.xs or self.ys != W.ys
         raise TypeError
 
-    # Addition
+    # Addition (with a single inversion for the whole vector)
     def __add__(self, W):
-        if isinstance(W, PointVector) and len(self.points) == len(W.points):
-            return PointVector([self.points[i] + W.points[i] for i in range(len(self.points))])
+        if isinstance(W, PointVector) and len(self.xs) == len(W.xs):
+            return PointVector.from_affine(affine_add_batch(self.affine(), W.affine()))
         return NotImplemented
 
-    # Subtraction
+    # Subtraction (with a single inversion for the whole vector)
     def __sub__(self, W):
-        if isinstance(W, PointVector) and len(self.points) == len(W.points):
-            return PointVector([self.points[i] - W.points[i] for i in range(len(self.points))])
+        if isinstance(W, PointVector) and len(self.xs) == len(W.xs):
+            return PointVector.from_affine(affine_add_batch(self.affine(), (-W).affine()))
         return NotImplemented
 
-    # Multiplication
+    # Multiplication (normalizing all products with a single inversion)
     def __mul__(self, s):
+        # deferred while `lazy` is set
+        if lazy and isinstance(s, (Scalar, ScalarVector)):
+            return LazyPointVector([([1] * len(self.xs), PointVector.from_columns(self.xs[:], self.ys[:]))]) * s
         # PointVector-Scalar: componentwise Point-Scalar multiplication
         if isinstance(s, Scalar):
-            return PointVector([self.points[i] * s for i in range(len(self.points))])
+            return PointVector.from_jacobian([jacobian_mul(P, s.x) for P in self.affine()])
         # PointVector-ScalarVector: Hadamard product
-        if isinstance(s, ScalarVector) and len(self.points) == len(s.scalars):
-            return PointVector([s[i] * self[i] for i in range(len(self))])
+        if isinstance(s, ScalarVector) and len(self.xs) == len(s.xs):
+            return PointVector.from_jacobian(batch_mul_jacobian(s.xs, self.affine()))
         return NotImplemented
 
     def __rmul__(self, s):
@@ -337,41 +832,47 @@ class PointVector:
             return self * s
         return NotImplemented
 
+    # Sum of all Points (a tree of batched affine additions)
+    def sum(self):
+        return Point.unchecked(*affine_sum_batch([self.affine()])[0])
+
     # Multiscalar multiplication
     def __pow__(self, s):
-        if isinstance(s, ScalarVector) and len(self.points) == len(s.scalars):
+        if isinstance(s, ScalarVector) and len(self.xs) == len(s.xs):
             return multiexp(s, self)
         return NotImplemented
 
     # Length
     def __len__(self):
-        return len(self.points)
+        return len(self.xs)
 
     # Get slice
     def __getitem__(self, i):
         if not isinstance(i, slice):
-            return self.points[i]
-        return PointVector(self.points[i])
+            return Point.unchecked(self.xs[i], self.ys[i])
+        return PointVector.from_columns(self.xs[i], self.ys[i])
 
     # Set at index
     def __setitem__(self, i, P):
         if isinstance(P, Point):
-            self.points[i] = P
+            self.xs[i] = P.x
+            self.ys[i] = P.y
         else:
             raise TypeError
 
     # Append
     def append(self, item):
         if isinstance(item, Point):
-            self.points.append(item)
+            self.xs.append(item.x)
+            self.ys.append(item.y)
         else:
             raise TypeError
 
     # Extend
     def extend(self, items):
         if isinstance(items, PointVector):
-            for item in items.points:
-                self.points.append(item)
+            self.xs.extend(items.xs)
+            self.ys.extend(items.ys)
         else:
             raise TypeError
 
@@ -379,53 +880,232 @@ class PointVector:
     def __repr__(self):
         return repr(self.points)
 
+    # Binary representation: fixed-width encoded points, 33 bytes each compressed or 65 bytes uncompressed
+    # -- the point at infinity is a 00 byte padded with zeros to the same width
+    def to_bytes(self, compressed=True):
+        infinity = bytes(33 if compressed else 65)
+        return b''.join(infinity if x == y == 0 else encode_point(x, y, compressed) for x, y in zip(self.xs, self.ys))
+
+    # Generated from a binary representation (any bytes-like object, such as a memoryview or mmap)
+    # -- uncompressed points are decoded without square roots
+    @classmethod
+    def from_bytes(cls, data, compressed=True):
+        data = memoryview(data)
+        width = 33 if compressed else 65
+        if len(data) % width != 0:
+            raise ValueError
+        pairs = [decode_point(data[i:i + width]) for i in range(0, len(data), width)]
+        return cls.from_affine(pairs)
+
+    # Negation
+    def __neg__(self):
+        return PointVector.from_columns(self.xs[:], [-y % p for y in self.ys])
+
+
+# Sum each of several PointVectors, sharing one inversion per tree level across all of them
+def point_sums(*vectors):
+    for W in vectors:
+        if not isinstance(W, PointVector):
+            raise TypeError
+    return PointVector.from_affine(affine_sum_batch([W.affine() for W in vectors]))
+
+
+# Lazy evaluation of PointVector expressions
+# -- while `lazy` is set, multiplying a PointVector by a Scalar or ScalarVector gives a LazyPointVector instead
+# -- a LazyPointVector holds its value as a sum of componentwise products (coefficients * PointVector),
+#    so further products, sums and negations only combine integer coefficients
+# -- the PointVectors in an expression are copied into it, so later changes to them do not affect it
+# -- a multiscalar multiplication folds the coefficients into a single multiexp over the distinct bases
+# -- it is a PointVector, so it works anywhere one does: reading `xs` or `ys` (directly or through any other method)
+#    computes the value once, with one batch multiplication per term and a single inversion
+lazy = False
+
+
+class LazyPointVector(PointVector):
+    # `terms` is a nonempty list of (coefficients, PointVector) with coefficients as integers modulo n
+    def __init__(self, terms):
+        if not terms:
+            raise ValueError
+        for coefficients, W in terms:
+            if not isinstance(W, PointVector):
+                raise TypeError
+            if len(coefficients) != len(W) or len(W) != len(terms[0][1]):
+                raise IndexError
+        self.terms = terms
+        self.value = None   # the computed PointVector, once needed
+
+    # Computed coordinate columns
+    @property
+    def xs(self):
+        return self.compute().xs
+
+    @property
+    def ys(self):
+        return self.compute().ys
+
+    # Compute the value once
+    def compute(self):
+        if self.value is None:
+            total = [J_INF] * len(self)
+            for coefficients, W in self.terms:
+                products = batch_mul_jacobian(coefficients, W.affine())
+                total = [jacobian_add(P, Q) for P, Q in zip(total, products)]
+            self.value = PointVector.from_jacobian(total)
+        return self.value
+
+    # The value as a new (eager) PointVector
+    def evaluate(self):
+        return PointVector.from_columns(self.xs[:], self.ys[:])
+
+    # Replace the expression by a private copy of its value, before changing it in place
+    def settle(self):
+        W = self.value = self.evaluate()
+        self.terms = [([1] * len(W), W)]
+        return W
+
+    # Length
+    def __len__(self):
+        return len(self.terms[0][1])
+
+    # Addition
+    def __add__(self, W):
+        if isinstance(W, LazyPointVector) and len(W) == len(self):
+            return LazyPointVector(self.terms + W.terms)
+        if isinstance(W, PointVector) and len(W) == len(self):
+            return LazyPointVector(self.terms + [([1] * len(W), PointVector.from_columns(W.xs[:], W.ys[:]))])
+        return NotImplemented
+
+    def __radd__(self, W):
+        return self + W
+
+    # Subtraction
+    def __sub__(self, W):
+        if isinstance(W, PointVector) and len(W) == len(self):
+            return self + (-W)
+        return NotImplemented
+
+    def __rsub__(self, W):
+        if isinstance(W, PointVector) and len(W) == len(self):
+            return -self + W
+        return NotImplemented
+
     # Negation
     def __neg__(self):
-        return PointVector([-P for P in self.points])
+        return LazyPointVector([([-c % n for c in coefficients], W) for coefficients, W in self.terms])
+
+    # Multiplication by a Scalar or (componentwise) a ScalarVector
+    def __mul__(self, s):
+        if isinstance(s, Scalar):
+            y = s.x
+            return LazyPointVector([([c * y % n for c in coefficients], W) for coefficients, W in self.terms])
+        if isinstance(s, ScalarVector) and len(s) == len(self):
+            return LazyPointVector([([c * y % n for c, y in zip(coefficients, s.xs)], W) for coefficients, W in self.terms])
+        return NotImplemented
+
+    def __rmul__(self, s):
+        return self * s
+
+    # Multiscalar multiplication, as a single multiexp over the distinct bases
+    def __pow__(self, s):
+        if not isinstance(s, ScalarVector) or len(s) != len(self):
+            return NotImplemented
+        terms = {}   # (x, y) -> merged coefficient
+        for coefficients, W in self.terms:
+            for c, y, P in zip(coefficients, s.xs, zip(W.xs, W.ys)):
+                terms[P] = (terms.get(P, 0) + c * y) % n
+        return from_jacobian(multiexp_merged(terms))
+
+    def __rpow__(self, s):
+        return self ** s
+
+    # Sum of all Points, as a single multiexp
+    def sum(self):
+        return self ** ScalarVector.from_ints([1] * len(self))
+
+    # Get a Point (computed with one multiexp unless the value is known), or a slice (still lazy)
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return LazyPointVector([(coefficients[i], W[i]) for coefficients, W in self.terms])
+        if self.value is not None:
+            return self.value[i]
+        terms = {}
+        for coefficients, W in self.terms:
+            P = (W.xs[i], W.ys[i])
+            terms[P] = (terms.get(P, 0) + coefficients[i]) % n
+        return from_jacobian(multiexp_merged(terms))
+
+    # In-place changes apply to the computed value
+    def __setitem__(self, i, P):
+        self.settle()[i] = P
+
+    def append(self, item):
+        W = self.settle()
+        W.append(item)
+        self.terms = [([1] * len(W), W)]
+
+    def extend(self, items):
+        W = self.settle()
+        W.extend(items)
+        self.terms = [([1] * len(W), W)]
 
 
 # A vector of Scalars with superpowers
+# -- stored as a list of raw integers, already reduced modulo n
+# -- Scalar objects are only built on indexing
 class ScalarVector:
     def __init__(self, scalars=None):
-        if scalars is None:
-            scalars = []
+        scalars = [] if scalars is None else list(scalars)
         for scalar in scalars:
             if not isinstance(scalar,Scalar):
                 raise TypeError
-        self.scalars = scalars
+        self.xs = [s.x for s in scalars]
+
+    # Build from integers, which must already be reduced modulo n
+    @classmethod
+    def from_ints(cls, xs):
+        s = cls.__new__(cls)
+        s.xs = xs
+        return s
+
+    # Underlying Scalars (built on demand)
+    # -- a new read-only list on every access: change the vector with indexing, `append` or `extend`
+    @property
+    def scalars(self):
+        return ReadOnlyList(Scalar.unchecked(x) for x in self.xs)
 
     # Equality
     def __eq__(self,s):
         if isinstance(s, ScalarVector):
-            return self.scalars == s.scalars
+            return self.xs == s.xs
         raise TypeError
 
     # Inequality
     def __ne__(self,s):
         if isinstance(s, ScalarVector):
-            return self.scalars != s.scalars
+            return self.xs != s.xs
         raise TypeError
 
     # Addition
     def __add__(self, s):
-        if isinstance(s, ScalarVector) and len(self.scalars) == len(s.scalars):
-            return ScalarVector([self.scalars[i] + s.scalars[i] for i in range(len(self.scalars))])
+        if isinstance(s, ScalarVector) and len(self.xs) == len(s.xs):
+            return ScalarVector.from_ints([(x + y) % n for x, y in zip(self.xs, s.xs)])
         return NotImplemented
 
     # Subtraction
     def __sub__(self,s):
-        if isinstance(s, ScalarVector) and len(self.scalars) == len(s.scalars):
-            return ScalarVector([self.scalars[i] - s.scalars[i] for i in range(len(self.scalars))])
+        if isinstance(s, ScalarVector) and len(self.xs) == len(s.xs):
+            return ScalarVector.from_ints([(x - y) % n for x, y in zip(self.xs, s.xs)])
         return NotImplemented
 
     # Multiplication
     def __mul__(self,s):
         # ScalarVector-Scalar: componentwise Scalar-Scalar multiplication 
         if isinstance(s, Scalar):
-            return ScalarVector([self.scalars[i] * s for i in range(len(self.scalars))])
+            y = s.x
+            return ScalarVector.from_ints([x * y % n for x in self.xs])
         # ScalarVector-ScalarVector: Hadamard product
-        if isinstance(s, ScalarVector) and len(self.scalars) == len(s.scalars):
-            return ScalarVector([self.scalars[i] * s.scalars[i] for i in range(len(self.scalars))])
+        if isinstance(s, ScalarVector) and len(self.xs) == len(s.xs):
+            return ScalarVector.from_ints([x * y % n for x, y in zip(self.xs, s.xs)])
         return NotImplemented
 
     def __rmul__(self, s):
@@ -436,19 +1116,13 @@ class ScalarVector:
 
     # Sum of all Scalars
     def sum(self):
-        r = Scalar(0)
-        for i in range(len(self.scalars)):
-            r += self.scalars[i]
-        return r
+        return Scalar.unchecked(sum(self.xs) % n)
 
     # Inner product and multiscalar multiplication
     def __pow__(self, s):
         # ScalarVector**ScalarVector: inner product
-        if isinstance(s, ScalarVector) and len(self.scalars) == len(s.scalars):
-            r = Scalar(0)
-            for i in range(len(self.scalars)):
-                r += self.scalars[i] * s.scalars[i]
-            return r
+        if isinstance(s, ScalarVector) and len(self.xs) == len(s.xs):
+            return Scalar.unchecked(sum(x * y for x, y in zip(self.xs, s.xs)) % n)
         # ScalarVector**PointVector: multiscalar multiplication
         if isinstance(s, PointVector):
             return s ** self
@@ -456,33 +1130,32 @@ class ScalarVector:
 
     # Length
     def __len__(self):
-        return len(self.scalars)
+        return len(self.xs)
 
     # Get slice
     def __getitem__(self, i):
         if not isinstance(i, slice):
-            return self.scalars[i]
-        return ScalarVector(self.scalars[i])
+            return Scalar.unchecked(self.xs[i])
+        return ScalarVector.from_ints(self.xs[i])
 
     # Set at index
     def __setitem__(self, i, s):
         if isinstance(s, Scalar):
-            self.scalars[i] = s
+            self.xs[i] = s.x
         else:
             raise TypeError
 
     # Append
     def append(self, item):
         if isinstance(item, Scalar):
-            self.scalars.append(item)
+            self.xs.append(item.x)
         else:
             raise TypeError
 
     # Extend
     def extend(self, items):
         if isinstance(items, ScalarVector):
-            for item in items.scalars:
-                self.scalars.append(item)
+            self.xs.extend(items.xs)
         else:
             raise TypeError
 
@@ -490,41 +1163,77 @@ class ScalarVector:
     def __repr__(self):
         return repr(self.scalars)
 
+    # Powers 1, x, x^2, ..., x^(length - 1) of a Scalar
+    @classmethod
+    def powers(cls, x, length):
+        if not isinstance(x, Scalar):
+            raise TypeError
+        xs = [1] * length
+        for i in range(1, length):
+            xs[i] = xs[i - 1] * x.x % n
+        return cls.from_ints(xs)
+
+    # Evaluate the polynomial with these coefficients (constant term first) at a Scalar, by Horner's rule
+    def evaluate(self, x):
+        if not isinstance(x, Scalar):
+            raise TypeError
+        y = x.x
+        r = 0
+        for c in reversed(self.xs):
+            r = (r * y + c) % n
+        return Scalar.unchecked(r)
+
+    # Evaluate the polynomial with these coefficients at each Scalar of a ScalarVector
+    def evaluate_many(self, s):
+        if not isinstance(s, ScalarVector):
+            raise TypeError
+        coefficients = self.xs[::-1]
+        results = []
+        for y in s.xs:
+            r = 0
+            for c in coefficients:
+                r = (r * y + c) % n
+            results.append(r)
+        return ScalarVector.from_ints(results)
+
+    # Binary representation: 32 bytes per Scalar, big-endian
+    def to_bytes(self):
+        return b''.join(x.to_bytes(b // 8, 'big') for x in self.xs)
+
+    # Generated from a binary representation (any bytes-like object, such as a memoryview or mmap)
+    # -- as for a Scalar, values of at least n are rejected rather than reduced
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        width = b // 8
+        if len(data) % width != 0:
+            raise ValueError
+        xs = [int.from_bytes(data[i:i + width], 'big') for i in range(0, len(data), width)]
+        if any(x >= n for x in xs):
+            raise ValueError
+        return cls.from_ints(xs)
+
     # Componentwise inversion (possibly with zero)
     def invert(self, allow_zero=False):
-        # If we allow zero, the efficient method doesn't work
-        if allow_zero:
-            return ScalarVector([s.invert(allow_zero=True) for s in self.scalars])
-
-        # Don't allow zero
-        inputs = self.scalars[:]
-        m = len(inputs)
-        scratch = [Scalar(1)] * m
-        acc = Scalar(1)
-
-        for i in range(m):
-            if inputs[i] == Scalar(0):
-                raise ZeroDivisionError
-            scratch[i] = acc
-            acc *= inputs[i]
-        acc = acc.invert()
-        for i in range(m - 1, -1, -1):
-            temp = acc * inputs[i]
-            inputs[i] = acc * scratch[i]
-            acc = temp
-
-        return ScalarVector(inputs)
+        # Montgomery's trick over the nonzero entries; zeros map to zero if allowed
+        if not allow_zero and 0 in self.xs:
+            raise ZeroDivisionError
+        inverses = iter(invert_batch([x for x in self.xs if x != 0], n))
+        return ScalarVector.from_ints([next(inverses) if x != 0 else 0 for x in self.xs])
 
     # Negation
     def __neg__(self):
-        return ScalarVector([-s for s in self.scalars])
+        return ScalarVector.from_ints([-x % n for x in self.xs])
 
 
 # Try to make a point from a given x-coordinate
-def make_point(x):
+# -- `even` picks the parity of y; if it is None, the parity is random
+def make_point(x, even=None):
     if not x < p:   # stay in the field
         return None
-    y = yfromx(x, secrets.randbits(1))
+    if even is None:
+        even = secrets.randbits(1)
+    y = yfromx(x, even)
     try:
         P = Point(x, y)
     except ValueError:
@@ -532,20 +1241,98 @@ def make_point(x):
     return P
 
 
-# Hash data to get a Point in the main subgroup
-def hash_to_point(*data):
+# A size-bounded least-recently-used cache
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    # Look up a key, returning None if it is missing
+    def get(self, key):
+        if key not in self.data:
+            return None
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    # Insert a key, evicting the least recently used entries beyond `maxsize`
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    # Remove all entries
+    def clear(self):
+        self.data.clear()
+
+    # Number of entries
+    def __len__(self):
+        return len(self.data)
+
+
+# Memoized results of `hash_to_point` and `generators`, keyed by the string forms of their inputs
+# -- `hash_cache` holds affine pairs, so callers always get a fresh Point they are free to change
+# -- set `maxsize` on either cache to bound its memory
+hash_cache = LRUCache(4096)
+generator_cache = LRUCache(16)
+
+
+# Hash the string forms of some data to an affine pair in the main subgroup
+# -- deterministic: the y-coordinate is always taken to be even
+def hash_strings_to_pair(strings):
     result = ''
-    for datum in data:
-        if datum is None:
-            raise TypeError
-        result += blake2s(str(datum).encode('utf-8')).hexdigest()
+    for string in strings:
+        result += blake2s(string.encode('utf-8')).hexdigest()
 
     # Continue hashing until we get a valid Point
     while True:
         result = blake2s(result.encode('utf-8')).hexdigest()
-        test = make_point(int(result, 16))
+        test = make_point(int(result, 16), True)
         if test is not None:
-            return test * Scalar(cofactor)
+            if cofactor != 1:
+                test = test * Scalar(cofactor)
+            return (test.x, test.y)
+
+
+# Look up the `hash_cache` key for hash_to_point inputs and its memoized pair, which is None if not yet computed
+def hash_lookup(data):
+    for datum in data:
+        if datum is None:
+            raise TypeError
+    key = tuple(str(datum) for datum in data)
+    return key, hash_cache.get(key)
+
+
+# Memoize a pair computed for a `hash_cache` key, returning it as a new Point
+def hash_memoize(key, pair):
+    hash_cache.put(key, pair)
+    return Point.unchecked(*pair)
+
+
+# Hash data to get a Point in the main subgroup
+# -- deterministic and memoized in `hash_cache`
+def hash_to_point(*data):
+    key, pair = hash_lookup(data)
+    if pair is None:
+        return hash_memoize(key, hash_strings_to_pair(key))
+    return Point.unchecked(*pair)
+
+
+# Derive `count` labelled generators hash_to_point(label, 0), ..., hash_to_point(label, count - 1)
+# -- the whole vector is memoized in `generator_cache`, separately from `hash_cache`
+# -- a vector not memoized is read from the precomputation cache if possible, and derived otherwise
+def generators(label, count):
+    if label is None:
+        raise TypeError
+    key = (str(label), count)
+    W = generator_cache.get(key)
+    if W is None:
+        if precomputation_cache is not None:
+            W = precomputation_cache.generators(*key)
+        if W is None:
+            W = PointVector.from_affine([hash_strings_to_pair((key[0], str(i))) for i in range(count)])
+        generator_cache.put(key, W)
+    return PointVector.from_columns(W.xs[:], W.ys[:])
 
 
 # Hash data to get a Scalar
@@ -564,6 +1351,57 @@ def hash_to_scalar(*data):
             return Scalar(test)
 
 
+# A Fiat-Shamir transcript
+# -- data is absorbed incrementally into a running blake2s state using binary encodings,
+#    so each challenge costs only the newly absorbed data rather than the whole history
+# -- each datum is framed as a type tag, an 8-byte length and the payload, so encodings are unambiguous
+class Transcript:
+    def __init__(self, label=''):
+        self.state = blake2s()
+        self.absorb(label)
+
+    # Absorb Scalars, Points, ScalarVectors, PointVectors, bytes-like objects, strings or integers
+    # -- integers are encoded as signed big-endian bytes, one byte longer than the bit length needs at most
+    def absorb(self, *data):
+        for datum in data:
+            if isinstance(datum, Scalar):
+                tag, payload = b's', datum.to_bytes()
+            elif isinstance(datum, Point):
+                tag, payload = b'p', datum.to_bytes()
+            elif isinstance(datum, ScalarVector):
+                tag, payload = b'S', datum.to_bytes()
+            elif isinstance(datum, PointVector):
+                tag, payload = b'P', datum.to_bytes()
+            elif isinstance(datum, (bytes, bytearray, memoryview)):
+                tag, payload = b'b', bytes(datum)
+            elif isinstance(datum, str):
+                tag, payload = b'u', datum.encode('utf-8')
+            elif isinstance(datum, int):
+                tag, payload = b'i', datum.to_bytes((datum.bit_length() + 8) // 8, 'big', signed=True)
+            else:
+                raise TypeError
+            self.state.update(tag + len(payload).to_bytes(8, 'big'))
+            self.state.update(payload)
+
+    # Squeeze a challenge Scalar, which is also absorbed so that later challenges differ
+    def challenge(self):
+        counter = 0
+        while True:
+            h = self.state.copy()
+            h.update(b'c' + counter.to_bytes(8, 'big'))
+            digest = h.digest()
+            test = int.from_bytes(digest, 'big')
+            if test < n:
+                break
+            counter += 1
+        self.state.update(b'c' + digest)
+        return Scalar.unchecked(test)
+
+    # Squeeze several challenge Scalars
+    def challenges(self, count):
+        return ScalarVector.from_ints([self.challenge().x for i in range(count)])
+
+
 # Generate a random Scalar
 def random_scalar(zero=True):
     value = Scalar(secrets.randbelow(n))
@@ -574,18 +1412,228 @@ def random_scalar(zero=True):
 
 # Generate a random Point in the main subgroup
 def random_point():
-    return hash_to_point(secrets.randbits(b))
+    P = Point.unchecked(*hash_strings_to_pair((str(secrets.randbits(b)),)))   # bypasses the cache
+    if secrets.randbits(1):
+        return -P
+    return P
 
 
 # The main subgroup default generator
-G = Point('0279BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798')
+# -- built from its coordinates so that importing the module needs no square root
+G = Point(0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+          0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8)
 
 
 # Point at infinity = identity/zero point of EC point addition
 Z = Point('00')
 
 
-# Perform a multiscalar multiplication using a simplified Pippenger algorithm
+# Window width for variable-base wNAF scalar multiplication
+# -- each multiplication precomputes 2^(w - 2) odd multiples and does about b / (w + 1) additions
+wnaf_width = 5
+
+
+# Use the endomorphism (GLV) for variable-base multiplication and multiexp
+glv = True
+
+
+# Scalar multiplication of an affine pair by an integer with the default strategy, returning Jacobian coordinates
+# -- fixed bases use their precomputed table (built on first use), other points use wNAF
+def jacobian_mul(P, k):
+    if P in fixed_bases:
+        return fixed_base_mul(fixed_base_table(P), k)
+    return wnaf_mul(P, k, wnaf_width, glv)
+
+
+# Batch scalar multiplication on raw values, returning Jacobian coordinates
+# -- `scalars` are nonnegative integers and `points` are affine pairs
+# -- a base that appears at least `batch_table_min` times shares a fixed-base table for the batch
+batch_table_min = 64
+
+
+def batch_mul_jacobian(scalars, points):
+    tables = {}
+    for P, count in Counter(points).items():
+        if P in fixed_bases:
+            tables[P] = fixed_base_table(P)
+        elif count >= batch_table_min and P != (0, 0):
+            tables[P] = build_fixed_base_table(P, fixed_base_width)
+    return [fixed_base_mul(tables[P], k) if P in tables else wnaf_mul(P, k, wnaf_width, glv)
+            for k, P in zip(scalars, points)]
+
+
+# Scalar multiplication with an explicit wNAF window width (at least 2) and GLV mode
+# -- `P * s` and `s * P` use this with the defaults `wnaf_width` and `glv`
+def scalar_mul(P, s, width=None, split=None):
+    if not isinstance(P, Point) or not isinstance(s, Scalar):
+        raise TypeError
+    if width is None:
+        width = wnaf_width
+    if split is None:
+        split = glv
+    if not isinstance(width, int) or width < 2:
+        raise ValueError
+    return from_jacobian(wnaf_mul((P.x, P.y), s.x, width, split))
+
+
+# Fixed-base multiplication
+# -- a registered base P gets a table of d * 2^(w * i) * P for each window i and 1 <= d <= 2^(w - 1)
+# -- with signed window digits, multiplication then needs only mixed additions and no doublings
+fixed_base_width = 8   # window width w used when a table is built
+fixed_bases = {}   # (x, y) -> table, or None if not yet built
+
+
+# Register a Point as a fixed base; its table is built lazily on first multiplication
+def register_fixed_base(P):
+    if not isinstance(P, Point):
+        raise TypeError
+    if P == Z:
+        raise ValueError
+    fixed_bases.setdefault((P.x, P.y), None)
+
+
+# Get the table for a registered fixed base (a Point or affine pair)
+# -- a table not yet built is read from the precomputation cache if possible, and built otherwise
+def fixed_base_table(P):
+    if isinstance(P, Point):
+        P = (P.x, P.y)
+    table = fixed_bases[P]
+    if table is None:
+        if precomputation_cache is not None:
+            table = precomputation_cache.fixed_base_table(P, fixed_base_width)
+        if table is None:
+            table = build_fixed_base_table(P, fixed_base_width)
+        fixed_bases[P] = table
+    return table
+
+
+# Build a fixed-base table of window width `width` for an affine pair
+def build_fixed_base_table(P, width):
+    half = 1 << (width - 1)
+    windows = (b + width - 1) // width + 1   # an extra window absorbs the final signed carry
+    multiples = []
+    base = (P[0], P[1], 1)
+    for i in range(windows):
+        multiple = base
+        multiples.append(multiple)
+        for d in range(1, half):
+            multiple = jacobian_add(multiple, base)
+            multiples.append(multiple)
+        base = jacobian_double(multiple)   # 2^w times the previous base
+    multiples = jacobian_to_affine_batch(multiples)
+
+    return [multiples[i * half:(i + 1) * half] for i in range(windows)]
+
+
+# Multiply a fixed-base table by an integer, returning Jacobian coordinates
+def fixed_base_mul(table, k):
+    width = len(table[0]).bit_length()
+    Q = J_INF
+    for row, d in zip(table, signed_digits(k, width)):
+        if d > 0:
+            Q = jacobian_add_affine(Q, row[d - 1])
+        elif d < 0:
+            x, y = row[-d - 1]
+            Q = jacobian_add_affine(Q, (x, p - y))
+    return Q
+
+
+register_fixed_base(G)
+
+
+# Split multiexp terms with the endomorphism
+# -- each (k, P) becomes two terms with nonnegative half-length scalars
+def glv_expand(scalars, points):
+    split_scalars = []
+    split_points = []
+    for k, P in zip(scalars, points):
+        k1, k2 = glv_split(k)
+        Q = endomorphism(P)
+        split_scalars += [abs(k1), abs(k2)]
+        split_points.append(P if k1 >= 0 else (P[0], -P[1] % p))
+        split_points.append(Q if k2 >= 0 else (Q[0], -Q[1] % p))
+    return split_scalars, split_points
+
+
+# Choose a Pippenger window width for `count` terms with `bits`-bit scalars
+# -- each window costs one bucket addition per term plus about 2^c additions to sum its 2^(c - 1) buckets
+def pippenger_window(count, bits):
+    best = None
+    for c in range(1, 25):
+        cost = (bits // c + 1) * (count + (1 << c))
+        if best is None or cost < best[0]:
+            best = (cost, c)
+    return best[1]
+
+
+# Pippenger multiscalar multiplication with signed-digit buckets, returning Jacobian coordinates
+# -- `scalars` are nonnegative integers and `points` are affine pairs
+# -- the window width `c` is chosen from the input size if not given
+def pippenger(scalars, points, c=None):
+    bits = max(scalars, default=0).bit_length()
+    if bits == 0:
+        return J_INF
+    if c is None:
+        c = pippenger_window(len(scalars), bits)
+    half = 1 << (c - 1)
+    windows = bits // c + 1   # an extra window absorbs the final signed carry
+
+    # recode every scalar into signed digits
+    digits = [[0] * len(scalars) for j in range(windows)]
+    for i, k in enumerate(scalars):
+        for j, d in enumerate(signed_digits(k, c)):
+            digits[j][i] = d
+
+    result = J_INF
+    for j in range(windows - 1, -1, -1):
+        for i in range(c):
+            result = jacobian_double(result)
+
+        # partition points into buckets by digit magnitude, negating for negative digits
+        buckets = [J_INF] * (half + 1)   # bucket 0 is never used
+        for d, P in zip(digits[j], points):
+            if d > 0:
+                buckets[d] = jacobian_add_affine(buckets[d], P)
+            elif d < 0:
+                buckets[-d] = jacobian_add_affine(buckets[-d], (P[0], -P[1] % p))
+        result = jacobian_add(result, sum_buckets(buckets))
+    return result
+
+
+# Naive multiscalar multiplication: one independent wNAF multiplication per term, returning Jacobian coordinates
+# -- `scalars` are nonnegative integers and `points` are affine pairs
+def naive_multiexp(scalars, points, width, split=False):
+    result = J_INF
+    for k, P in zip(scalars, points):
+        result = jacobian_add(result, wnaf_mul(P, k, width, split))
+    return result
+
+
+# Straus multiscalar multiplication: interleaved wNAF over all terms, returning Jacobian coordinates
+# -- `scalars` are nonnegative integers and `points` are affine pairs
+# -- all terms share one chain of doublings, and all tables share one inversion
+def straus(scalars, points, width, split=False):
+    terms = [(k, P) for k, P in zip(scalars, points) if k != 0 and P != (0, 0)]
+    tables = odd_multiples_batch([(P[0], P[1], 1) for k, P in terms], width)
+    interleaved = []
+    for (k, P), table in zip(terms, tables):
+        if split:
+            k1, k2 = glv_split(k)
+            interleaved += [(table, k1), ([endomorphism(R) for R in table], k2)]
+        else:
+            interleaved.append((table, k))
+    return interleaved_wnaf(interleaved)
+
+
+# Crossover thresholds for multiexp, by number of terms
+# -- up to `multiexp_naive_max` terms are multiplied independently
+# -- up to `multiexp_straus_max` terms use Straus, and larger inputs use Pippenger
+# -- `python bench_dumbp256k1.py` times all three to validate these
+multiexp_naive_max = 1
+multiexp_straus_max = 32
+
+
+# Perform a multiscalar multiplication, choosing the algorithm by input size
 def multiexp(scalars, points):
     if not isinstance(scalars, ScalarVector) or not isinstance(points, PointVector):
         raise TypeError
@@ -594,47 +1642,677 @@ def multiexp(scalars, points):
         raise IndexError
     if len(scalars) == 0:
         return Z
+    if isinstance(points, LazyPointVector):
+        return points ** scalars
+
+    return from_jacobian(multiexp_jacobian(scalars.xs, points.affine()))
+
+
+# Multiscalar multiplication on raw values, choosing the algorithm by input size
+# -- `scalars` are nonnegative integers and `points` are affine pairs; returns Jacobian coordinates
+def multiexp_jacobian(scalars, points):
+    if len(scalars) <= multiexp_naive_max:
+        return naive_multiexp(scalars, points, wnaf_width, glv)
+    if len(scalars) <= multiexp_straus_max:
+        return straus(scalars, points, wnaf_width, glv)
+
+    # with the endomorphism, each term becomes two terms with half-length scalars
+    if glv:
+        scalars, points = glv_expand(scalars, points)
+
+    return pippenger(scalars, points)
+
+
+# Default window width for `multiexp_stream` when the input size is not known
+stream_window = 10
+
+
+# Perform a multiscalar multiplication over an iterable, with memory bounded independently of its length
+# -- items are (Scalar, Point) pairs or (ScalarVector, PointVector) chunks, such as vectors decoded from a file
+# -- terms are added straight into signed-digit buckets for every window, so only the buckets are held
+# -- the window width is `c` if given, chosen from `size_hint` (the expected number of terms) if given,
+#    and `stream_window` otherwise
+def multiexp_stream(items, c=None, size_hint=None):
+    if c is None:
+        c = stream_window if size_hint is None else pippenger_window(2 * size_hint if glv else size_hint, b // 2 if glv else b)
+    half = 1 << (c - 1)
+    buckets = []   # buckets[j][d] accumulates the points with digit d in window j
+
+    # add one term, with a nonnegative integer scalar and an affine pair, to the buckets
+    def accumulate(k, P):
+        for j, d in enumerate(signed_digits(k, c)):
+            if j == len(buckets):
+                buckets.append([J_INF] * (half + 1))
+            if d > 0:
+                buckets[j][d] = jacobian_add_affine(buckets[j][d], P)
+            elif d < 0:
+                buckets[j][-d] = jacobian_add_affine(buckets[j][-d], (P[0], -P[1] % p))
+
+    for item in items:
+        if len(item) != 2:
+            raise TypeError
+        scalars, points = item
+        if isinstance(scalars, Scalar) and isinstance(points, Point):
+            scalars = [scalars.x]
+            points = [(points.x, points.y)]
+        elif isinstance(scalars, ScalarVector) and isinstance(points, PointVector):
+            if len(scalars) != len(points):
+                raise IndexError
+            scalars = scalars.xs
+            points = points.affine()
+        else:
+            raise TypeError
+        if glv:
+            scalars, points = glv_expand(scalars, points)
+        for k, P in zip(scalars, points):
+            accumulate(k, P)
+
+    result = J_INF
+    for window in reversed(buckets):
+        for i in range(c):
+            result = jacobian_double(result)
+        result = jacobian_add(result, sum_buckets(window))
+    return from_jacobian(result)
+
+
+# Check many multiexp equations `scalars ** points == result` at once
+# -- each equation is a (ScalarVector, PointVector, Point) triple
+# -- the equations are weighted by random nonzero Scalars and terms sharing a base are merged,
+#    so a single multiexp checks that the weighted sum of all (scalars ** points - result) is the identity
+# -- true equations always pass, and a set containing a false one passes with probability about 1/n
+# -- returns whether all equations hold, or with `locate` the indices of the false ones, found by bisection
+def batch_verify(equations, locate=False):
+    equations = list(equations)
+    for equation in equations:
+        if len(equation) != 3:
+            raise TypeError
+        scalars, points, result = equation
+        if not isinstance(scalars, ScalarVector) or not isinstance(points, PointVector) or not isinstance(result, Point):
+            raise TypeError
+        if len(scalars) != len(points):
+            raise IndexError
+
+    if not locate:
+        return batch_holds(equations)
+
+    # bisect the failing sets
+    def failing(indices):
+        if batch_holds([equations[i] for i in indices]):
+            return []
+        if len(indices) == 1:
+            return indices
+        middle = len(indices) // 2
+        return failing(indices[:middle]) + failing(indices[middle:])
+
+    return failing(list(range(len(equations))))
+
+
+# Check a random linear combination of (ScalarVector, PointVector, Point) equations with one multiexp
+def batch_holds(equations):
+    terms = {}   # (x, y) -> merged coefficient
+    for i, (scalars, points, result) in enumerate(equations):
+        weight = 1 if i == 0 else secrets.randbelow(n - 1) + 1   # the first weight can be fixed
+        for k, x, y in zip(scalars.xs, points.xs, points.ys):
+            terms[(x, y)] = (terms.get((x, y), 0) + weight * k) % n
+        R = (result.x, result.y)
+        terms[R] = (terms.get(R, 0) - weight) % n
+    return multiexp_merged(terms)[2] == 0
+
+
+# Multiscalar multiplication of merged terms, given as a dict of affine pairs to integer coefficients
+# -- returns Jacobian coordinates; the point at infinity and zero coefficients are dropped
+def multiexp_merged(terms):
+    terms = {P: k for P, k in terms.items() if k != 0 and P != (0, 0)}
+    if not terms:
+        return J_INF
+    return multiexp_jacobian(list(terms.values()), list(terms))
+
+
+# Defaults for parallel multiexp
+# -- `parallel_workers` is the process count (None means one per CPU)
+# -- inputs shorter than `parallel_min_size` are evaluated serially, since pool overhead would dominate
+parallel_workers = None
+parallel_min_size = 4096
+
+
+# Evaluate one chunk of a parallel multiexp in a worker process, returning Jacobian coordinates
+# -- takes raw integer columns, which pickle far more compactly than Point objects
+def multiexp_chunk(scalars, xs, ys):
+    return multiexp_jacobian(scalars, list(zip(xs, ys)))
+
+
+# Apply `fn` to chunks of raw (scalars, xs, ys) columns across a process pool, returning the list of results
+# -- `workers` and `chunk_size` default to `parallel_workers` and an even split across the workers
+# -- an existing `executor` (such as a ProcessPoolExecutor) may be supplied instead of starting a new pool
+# -- inputs shorter than `min_size`, or with a single worker and no executor, are one chunk evaluated here
+def run_chunks(fn, scalars, points, workers, chunk_size, executor, min_size):
+    if workers is None:
+        workers = parallel_workers or os.cpu_count() or 1
+    if len(scalars) < min_size or (workers <= 1 and executor is None):
+        return [fn(scalars.xs, points.xs, points.ys)]
+    if chunk_size is None:
+        chunk_size = -(-len(scalars) // workers)
+    if chunk_size < 1:
+        raise ValueError
+
+    chunks = [(scalars.xs[i:i + chunk_size], points.xs[i:i + chunk_size], points.ys[i:i + chunk_size])
+              for i in range(0, len(scalars), chunk_size)]
+    if executor is not None:
+        return list(executor.map(fn, *zip(*chunks)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, *zip(*chunks)))
+
+
+# Perform a multiscalar multiplication split into chunks across a process pool
+# -- `workers`, `chunk_size` and `executor` work as for `run_chunks`, with `parallel_min_size`
+def parallel_multiexp(scalars, points, workers=None, chunk_size=None, executor=None):
+    if not isinstance(scalars, ScalarVector) or not isinstance(points, PointVector):
+        raise TypeError
+    if len(scalars) != len(points):
+        raise IndexError
 
-    buckets = None
-    result = Z   # zero point
+    result = J_INF
+    for partial in run_chunks(multiexp_chunk, scalars, points, workers, chunk_size, executor, parallel_min_size):
+        result = jacobian_add(result, partial)
+    return from_jacobian(result)
 
-    c = 4   # window parameter; NOTE: the optimal value actually depends on len(points) empirically
 
-    # really we want to use the max bitlength to compute groups
-    maxscalar = int(max(scalars))
-    groups = 0
-    while maxscalar >= 2 ** groups:
-        groups += 1
-    groups = int((groups + c - 1) / c)
+# Inputs to `batch_mul` shorter than this are evaluated serially
+batch_parallel_min_size = 256
 
-    # loop is really (groups-1)..0
-    for k in range(groups - 1, -1, -1):
-        if result != Z:
-            for i in range(c):
-                result += result
 
-        buckets = [Z] * (2 ** c)   # clear all buckets
+# Evaluate one chunk of a parallel batch multiplication in a worker process
+# -- takes and returns raw integer columns; the products are normalized with one inversion per chunk
+def batch_mul_chunk(scalars, xs, ys):
+    pairs = jacobian_to_affine_batch(batch_mul_jacobian(scalars, list(zip(xs, ys))))
+    return [P[0] for P in pairs], [P[1] for P in pairs]
 
-        # partition scalars into buckets
-        for i in range(len(scalars)):
-            bucket = 0
-            for j in range(c):
-                if int(scalars[i]) & (1 << (k * c + j)):   # test for bit
-                    bucket |= 1 << j
 
-            if bucket == 0:   # zero bucket is never used
-                continue
+# Multiply many (Scalar, Point) pairs, returning a PointVector of the products
+# -- `points` is a PointVector of the same length, or a single Point used as the base for every Scalar
+# -- bases that repeat within a chunk share a fixed-base table, as do registered fixed bases such as G
+# -- `workers`, `chunk_size` and `executor` work as for `run_chunks`, with `batch_parallel_min_size`
+def batch_mul(scalars, points, workers=None, chunk_size=None, executor=None):
+    if not isinstance(scalars, ScalarVector):
+        raise TypeError
+    if isinstance(points, Point):
+        points = PointVector.from_columns([points.x] * len(scalars), [points.y] * len(scalars))
+    if not isinstance(points, PointVector):
+        raise TypeError
+    if len(scalars) != len(points):
+        raise IndexError
+
+    results = run_chunks(batch_mul_chunk, scalars, points, workers, chunk_size, executor, batch_parallel_min_size)
+    W = PointVector()
+    for xs, ys in results:
+        W.xs.extend(xs)
+        W.ys.extend(ys)
+    return W
+
+
+# Choose a MultiexpContext window width for `count` points
+# -- each evaluation costs about count * (b / c + 1) additions plus 2^c to sum the buckets
+def context_window(count):
+    best = None
+    for c in range(1, 25):
+        cost = count * (b // c + 1) + (1 << c)
+        if best is None or cost < best[0]:
+            best = (cost, c)
+    return best[1]
+
+
+# Precomputed multiscalar multiplication against a fixed PointVector
+# -- for each point P and window j, the table holds 2^(c * j) * P, so evaluation needs no doublings
+#    and all windows share one set of signed-digit buckets
+# -- a larger `width` c means a smaller table (about len(points) * b / c entries)
+#    but 2^(c - 1) buckets to sum per evaluation; by default c minimizes the evaluation cost
+# -- use as `context.multiexp(scalars)` or `scalars ** context`
+class MultiexpContext:
+    def __init__(self, points, width=None):
+        if not isinstance(points, PointVector):
+            raise TypeError
+        if width is None:
+            width = context_window(len(points))
+        if not isinstance(width, int) or width < 1:
+            raise ValueError
+        self.width = width
+        self.windows = b // width + 1   # an extra window absorbs the final signed carry
+
+        multiples = []
+        for P in points.affine():
+            Q = (P[0], P[1], 1) if P != (0, 0) else J_INF
+            for j in range(self.windows):
+                multiples.append(Q)
+                for i in range(width):
+                    Q = jacobian_double(Q)
+        self.table = jacobian_to_affine_batch(multiples)   # entry i * windows + j is 2^(c * j) times point i
+
+    # Number of points
+    def __len__(self):
+        return len(self.table) // self.windows
+
+    # Multiscalar multiplication against the fixed points
+    def multiexp(self, scalars):
+        if not isinstance(scalars, ScalarVector):
+            raise TypeError
+        if len(scalars) != len(self):
+            raise IndexError
+
+        table = self.table
+        buckets = [J_INF] * ((1 << (self.width - 1)) + 1)   # bucket 0 is never used
+        for i, k in enumerate(scalars.xs):
+            for index, d in enumerate(signed_digits(k, self.width), i * self.windows):
+                if d > 0:
+                    buckets[d] = jacobian_add_affine(buckets[d], table[index])
+                elif d < 0:
+                    x, y = table[index]
+                    buckets[-d] = jacobian_add_affine(buckets[-d], (x, -y % p))
+        return from_jacobian(sum_buckets(buckets))
+
+    # ScalarVector**MultiexpContext: multiscalar multiplication
+    def __rpow__(self, s):
+        if isinstance(s, ScalarVector):
+            return self.multiexp(s)
+        return NotImplemented
+
+    # Write the table to a file
+    # -- format: width and point count as 4-byte big-endian integers, then the table as an uncompressed PointVector
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.width.to_bytes(4, 'big') + len(self).to_bytes(4, 'big'))
+            f.write(PointVector.from_affine(self.table).to_bytes(compressed=False))
+
+    # Read a table written by `save`
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = memoryview(f.read())
+        if len(data) < 8:
+            raise ValueError
+        context = cls.__new__(cls)
+        context.width = int.from_bytes(data[0:4], 'big')
+        if context.width < 1:
+            raise ValueError
+        context.windows = b // context.width + 1
+        count = int.from_bytes(data[4:8], 'big')
+        if len(data) != 8 + 65 * count * context.windows:
+            raise ValueError
+        context.table = PointVector.from_bytes(data[8:], compressed=False).affine()
+        return context
+
+
+# Persistent precomputation cache
+# -- a file of fixed-base tables and generator vectors that a process can map instead of rebuilding them
+# -- the file is memory-mapped read-only, so processes using it share its pages, and entries are decoded on first lookup
+# -- format: magic, then version and entry count as 4-byte big-endian integers, a directory, and the entry data
+# -- a directory entry is a kind byte, a 2-byte key length and key, a 4-byte width, and an 8-byte offset and length
+# -- fixed-base tables are keyed by the compressed base, generator vectors by a 4-byte count and the UTF-8 label
+# -- entry data are uncompressed PointVectors; a table is stored row by row
+# -- lookups ignore entries that are damaged or fail a spot-check, so that data is rebuilt instead:
+#    a table must start with its base, the second entry of each row must double the first, and each row must start
+#    with twice the last entry of the row before; a generator vector must start with its first hashed generator
+cache_magic = b'DP256K1\x00'
+cache_version = 1
+cache_table_kind = ord('T')
+cache_generators_kind = ord('G')
+precomputation_cache = None   # the PrecomputationCache in use, if any
+
+
+class PrecomputationCache:
+    # Map a file and read its directory, raising ValueError (with the file unmapped) if it cannot be used
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.entries = self.read_directory()   # (kind, key) -> (width, offset, length)
+        except ValueError:
+            self.map.close()
+            raise
+
+    # Check the header and read the directory
+    def read_directory(self):
+        data = self.map
+        if len(data) < 16 or data[:8] != cache_magic:
+            raise ValueError
+        if int.from_bytes(data[8:12], 'big') != cache_version:
+            raise ValueError
+        entries = {}
+        index = 16
+        for _ in range(int.from_bytes(data[12:16], 'big')):
+            if index + 3 > len(data):
+                raise ValueError
+            kind = data[index]
+            size = int.from_bytes(data[index + 1:index + 3], 'big')
+            if index + 3 + size + 20 > len(data):
+                raise ValueError
+            key = data[index + 3:index + 3 + size]
+            index += 3 + size
+            width = int.from_bytes(data[index:index + 4], 'big')
+            offset = int.from_bytes(data[index + 4:index + 12], 'big')
+            length = int.from_bytes(data[index + 12:index + 20], 'big')
+            index += 20
+            if offset + length > len(data) or length % 65 != 0:
+                raise ValueError
+            entries[(kind, key)] = (width, offset, length)
+        return entries
+
+    # Number of entries
+    def __len__(self):
+        return len(self.entries)
+
+    # Raw data of an entry
+    def raw(self, entry):
+        width, offset, length = entry
+        return self.map[offset:offset + length]
+
+    # Decode an entry as a PointVector
+    def read(self, entry):
+        width, offset, length = entry
+        with memoryview(self.map) as view:
+            return PointVector.from_bytes(view[offset:offset + length], compressed=False)
+
+    # Look up the fixed-base table of window width `width` for an affine pair, or None
+    def fixed_base_table(self, P, width):
+        entry = self.entries.get((cache_table_kind, encode_point(P[0], P[1], True)))
+        if entry is None or entry[0] != width:
+            return None
+        half = 1 << (width - 1)
+        windows = (b + width - 1) // width + 1
+        if entry[2] != 65 * half * windows:
+            return None
+        try:
+            multiples = self.read(entry).affine()
+        except ValueError:
+            return None
+        rows = [multiples[i * half:(i + 1) * half] for i in range(windows)]
+
+        # spot-check the structure, normalizing all the doublings with one inversion
+        firsts = [row[0] for row in rows]
+        lasts = [row[-1] for row in rows]
+        bases = (firsts if half > 1 else []) + lasts[:-1]
+        claimed = ([row[1] for row in rows] if half > 1 else []) + firsts[1:]
+        if firsts[0] != tuple(P) or jacobian_to_affine_batch([jacobian_double((x, y, 1)) for x, y in bases]) != claimed:
+            return None
+        return rows
+
+    # Look up the generator vector for a label and count, or None
+    def generators(self, label, count):
+        entry = self.entries.get((cache_generators_kind, count.to_bytes(4, 'big') + label.encode('utf-8')))
+        if entry is None or entry[2] != 65 * count:
+            return None
+        try:
+            W = self.read(entry)
+        except ValueError:
+            return None
+        if count > 0 and (W.xs[0], W.ys[0]) != hash_strings_to_pair((label, '0')):   # spot-check the derivation
+            return None
+        return W
+
+    # Unmap the file
+    def close(self):
+        self.map.close()
+
+
+# Write a precomputation cache file
+# -- includes tables for all registered fixed bases (building any not yet built), all memoized generator vectors,
+#    the generator vectors for the (label, count) pairs in `generator_sets`, and the entries of the cache in use
+# -- the file is written under a temporary name and then renamed, so processes mapping an old version are unaffected
+def save_cache(path, generator_sets=()):
+    entries = {}
+    for P in list(fixed_bases):
+        table = fixed_base_table(P)
+        key = (cache_table_kind, encode_point(P[0], P[1], True))
+        entries[key] = (len(table[0]).bit_length(), PointVector.from_affine([Q for row in table for Q in row]).to_bytes(compressed=False))
+    for label, count in generator_sets:
+        generators(label, count)
+    for (label, count), W in generator_cache.data.items():
+        key = (cache_generators_kind, count.to_bytes(4, 'big') + label.encode('utf-8'))
+        entries[key] = (0, W.to_bytes(compressed=False))
+    if precomputation_cache is not None:
+        for key, entry in precomputation_cache.entries.items():
+            if key not in entries:
+                entries[key] = (entry[0], precomputation_cache.raw(entry))
+
+    offset = 16 + sum(3 + len(key) + 20 for kind, key in entries)
+    directory = []
+    for (kind, key), (width, data) in entries.items():
+        directory.append(bytes([kind]) + len(key).to_bytes(2, 'big') + key + width.to_bytes(4, 'big')
+                         + offset.to_bytes(8, 'big') + len(data).to_bytes(8, 'big'))
+        offset += len(data)
+
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'wb') as f:
+        f.write(cache_magic + cache_version.to_bytes(4, 'big') + len(entries).to_bytes(4, 'big'))
+        f.write(b''.join(directory))
+        for width, data in entries.values():
+            f.write(data)
+    os.replace(temporary, path)
+
+
+# Use a precomputation cache file for fixed-base tables and generator vectors, returning the PrecomputationCache
+# -- None stops using a cache; tables and vectors already read stay in memory
+def load_cache(path):
+    global precomputation_cache
+    precomputation_cache = None if path is None else PrecomputationCache(path)
+    return precomputation_cache
+
+
+# Use the cache file named by the DUMBP256K1_CACHE environment variable, if it exists
+# -- a file that cannot be used (another version, or damaged) is ignored, and everything is built as needed
+if os.path.isfile(os.environ.get('DUMBP256K1_CACHE', '')):
+    try:
+        load_cache(os.environ['DUMBP256K1_CACHE'])
+    except (OSError, ValueError):
+        precomputation_cache = None
+
+
+# Awaitable wrappers for the heavy operations
+# -- the work runs in `executor`, or `async_executor` if not given; None means the event loop's default thread pool
+# -- a ProcessPoolExecutor sidesteps the GIL; arguments are sent as raw integers either way
+# -- cancelling the awaiting task cancels work that has not started yet
+async_executor = None
+
+
+# Run a function in the chosen executor
+async def run_in_executor(fn, *args, executor=None):
+    if executor is None:
+        executor = async_executor
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+# Awaitable multiexp
+async def multiexp_async(scalars, points, executor=None):
+    if not isinstance(scalars, ScalarVector) or not isinstance(points, PointVector):
+        raise TypeError
+    if len(scalars) != len(points):
+        raise IndexError
+    return from_jacobian(await run_in_executor(multiexp_chunk, scalars.xs, points.xs, points.ys, executor=executor))
+
 
-            if buckets[bucket] != Z:
-                buckets[bucket] += points[i]
+# Awaitable scalar multiplication
+async def mul_async(scalar, point, executor=None):
+    if not isinstance(scalar, Scalar) or not isinstance(point, Point):
+        raise TypeError
+    return from_jacobian(await run_in_executor(jacobian_mul, (point.x, point.y), scalar.x, executor=executor))
+
+
+# Awaitable hash_to_point, sharing this process's `hash_cache`
+async def hash_to_point_async(*data, executor=None):
+    key, pair = hash_lookup(data)
+    if pair is None:
+        return hash_memoize(key, await run_in_executor(hash_strings_to_pair, key, executor=executor))
+    return Point.unchecked(*pair)
+
+
+# Evaluate several independent multiexps in one worker call, returning Jacobian coordinates for each
+def multiexp_batch(jobs):
+    return [multiexp_chunk(*job) for job in jobs]
+
+
+# Collects multiexps submitted concurrently and evaluates them as one executor job
+# -- requests arriving within `delay` seconds of the first are batched, up to `max_batch` per job
+# -- independent multiexps cannot share a result, so batching saves per-job dispatch and transfer
+#    overhead rather than curve arithmetic
+class MultiexpBatcher:
+    def __init__(self, executor=None, delay=0, max_batch=64):
+        self.executor = executor
+        self.delay = delay
+        self.max_batch = max_batch
+        self.pending = []
+        self.handle = None
+
+    # Awaitable multiexp, batched with other concurrent requests
+    async def multiexp(self, scalars, points):
+        if not isinstance(scalars, ScalarVector) or not isinstance(points, PointVector):
+            raise TypeError
+        if len(scalars) != len(points):
+            raise IndexError
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((future, (scalars.xs[:], points.xs[:], points.ys[:])))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.handle is None:
+            self.handle = loop.call_later(self.delay, self.flush)
+        return await future
+
+    # Send all pending requests that are still wanted to the executor as one job
+    def flush(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        batch = [(future, job) for future, job in self.pending if not future.cancelled()]
+        self.pending = []
+        if len(batch) == 0:
+            return
+        executor = self.executor if self.executor is not None else async_executor
+        job = asyncio.get_running_loop().run_in_executor(executor, multiexp_batch, [job for future, job in batch])
+        job.add_done_callback(lambda job: self.resolve(batch, job))
+
+    # Hand the results of a finished job back to its requests
+    def resolve(self, batch, job):
+        for i, (future, _) in enumerate(batch):
+            if future.done():
+                continue
+            if job.cancelled():
+                future.cancel()
+            elif job.exception() is not None:
+                future.set_exception(job.exception())
             else:
-                buckets[bucket] = points[i]
-
-        # sum the buckets
-        pail = Z
-        for i in range(len(buckets) - 1, 0, -1):
-            if buckets[i] != Z:
-                pail += buckets[i]
-            if pail != Z:
-                result += pail
-    return result
+                future.set_result(from_jacobian(job.result()[i]))
+
+
+# Operation counting and timing for profiling
+# -- while a Profile is active, the primitives and top-level calls below are replaced by counting wrappers;
+#    otherwise the originals are in place, so there is no overhead at all when profiling is off
+# -- work done in other processes (parallel_multiexp, batch_mul or process executors) is not counted
+# -- each entry is (owner, attribute, counter name), where the owner is this module or a class
+def profiled_primitives():
+    module = sys.modules[__name__]
+    return [
+        (module, 'invert', 'inversions'),
+        (module, 'jacobian_add', 'additions'),
+        (module, 'jacobian_add_affine', 'additions'),
+        (module, 'affine_add_batch', 'additions'),   # counted per element
+        (Point, '__add__', 'additions'),
+        (Point, '__sub__', 'additions'),
+        (module, 'jacobian_double', 'doublings'),
+        (Point, 'on_curve', 'curve_checks'),
+        (Scalar, '__init__', 'scalars'),
+        (Scalar, 'unchecked', 'scalars'),
+    ]
+
+
+# Top-level calls that are timed individually, as (owner, attribute, name)
+def profiled_calls():
+    module = sys.modules[__name__]
+    return [
+        (module, 'multiexp', 'multiexp'),
+        (module, 'parallel_multiexp', 'parallel_multiexp'),
+        (module, 'batch_mul', 'batch_mul'),
+        (module, 'scalar_mul', 'scalar_mul'),
+        (module, 'hash_to_point', 'hash_to_point'),
+        (module, 'hash_to_scalar', 'hash_to_scalar'),
+        (Point, '__mul__', 'Point.__mul__'),
+        (MultiexpContext, 'multiexp', 'MultiexpContext.multiexp'),
+    ]
+
+
+# Counts primitive operations while active, and records each top-level call
+# -- use as a context manager (`with Profile() as profile:`) or toggle with `start()` and `stop()`
+# -- `counts` holds the totals; `calls` holds (name, seconds, counts) for each outermost top-level call
+# -- only one Profile can be active at a time, so that `stop` always restores the originals
+active_profile = None
+
+
+class Profile:
+    def __init__(self):
+        self.counts = Counter()
+        self.calls = []
+        self.saved = None
+        self.depth = 0
+
+    # Install the counting wrappers
+    def start(self):
+        global active_profile
+        if active_profile is not None:
+            raise RuntimeError
+        active_profile = self
+        self.saved = []
+        for owner, attribute, counter in profiled_primitives():
+            self.patch(owner, attribute, lambda fn, counter=counter, attribute=attribute: self.counting(fn, counter, attribute == 'affine_add_batch'))
+        for owner, attribute, name in profiled_calls():
+            self.patch(owner, attribute, lambda fn, name=name: self.timing(fn, name))
+        return self
+
+    # Restore the originals
+    def stop(self):
+        global active_profile
+        if active_profile is not self:
+            raise RuntimeError
+        for owner, attribute, original in reversed(self.saved):
+            setattr(owner, attribute, original)
+        self.saved = None
+        active_profile = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Replace an attribute with a wrapper, keeping the original for `stop`
+    def patch(self, owner, attribute, wrap):
+        original = vars(owner)[attribute]
+        if isinstance(original, classmethod):
+            wrapped = classmethod(wrap(original.__func__))
+        else:
+            wrapped = wrap(original)
+        self.saved.append((owner, attribute, original))
+        setattr(owner, attribute, wrapped)
+
+    # Wrap a primitive so that each call adds to a counter (or adds the length of its first argument)
+    def counting(self, fn, counter, per_element=False):
+        counts = self.counts
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            counts[counter] += len(args[0]) if per_element else 1
+            return fn(*args, **kwargs)
+        return wrapper
+
+    # Wrap a top-level call so that the outermost call records its time and counts
+    def timing(self, fn, name):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if self.depth > 0:
+                return fn(*args, **kwargs)
+            self.depth += 1
+            before = self.counts.copy()
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.depth -= 1
+                self.calls.append((name, time.perf_counter() - start, self.counts - before))
+        return wrapper
@@ -1,7 +1,7 @@
 # Testing Dumbp256k1
 # Only "more complex" functions are tested because lazy
 
-import pytest, secrets
+import asyncio, concurrent.futures, mmap, os, pytest, secrets, subprocess, sys
 import dumbp256k1
 
 
@@ -109,3 +109,653 @@ def test_vector_products():
             svector2.append(dumbp256k1.random_scalar(zero=True))
         svector2 = dumbp256k1.ScalarVector(svector2)
         assert svector1 ** (svector2 * pvector) == (svector1 ** svector2) * dumbp256k1.G
+
+
+def test_jacobian():
+    # test point at infinity
+    assert dumbp256k1.from_jacobian(dumbp256k1.to_jacobian(dumbp256k1.Z)) == dumbp256k1.Z
+    assert dumbp256k1.from_jacobian(dumbp256k1.jacobian_double(dumbp256k1.J_INF)) == dumbp256k1.Z
+    G = dumbp256k1.to_jacobian(dumbp256k1.G)
+    assert dumbp256k1.from_jacobian(dumbp256k1.jacobian_add(G, dumbp256k1.jacobian_neg(G))) == dumbp256k1.Z
+    assert dumbp256k1.from_jacobian(dumbp256k1.jacobian_add(G, G)) == dumbp256k1.G + dumbp256k1.G
+    # randomized testing, with non-trivial Z coordinates
+    for i in range(20):
+        P = dumbp256k1.random_point()
+        Q = dumbp256k1.random_point()
+        JP = dumbp256k1.jacobian_double(dumbp256k1.to_jacobian(P))
+        JQ = dumbp256k1.jacobian_double(dumbp256k1.to_jacobian(Q))
+        assert dumbp256k1.from_jacobian(JP) == P + P
+        assert dumbp256k1.from_jacobian(dumbp256k1.jacobian_add(JP, JQ)) == (P + P) + (Q + Q)
+        assert dumbp256k1.from_jacobian(dumbp256k1.jacobian_add_affine(JP, (Q.x, Q.y))) == (P + P) + Q
+        assert dumbp256k1.from_jacobian(dumbp256k1.jacobian_add_affine(JP, (P.x, P.y))) == P + P + P
+
+
+def test_fixed_base():
+    P = dumbp256k1.random_point()
+    scalars = [dumbp256k1.Scalar(0), dumbp256k1.Scalar(1), dumbp256k1.Scalar(-1), dumbp256k1.Scalar(2 ** 255)]
+    scalars += [dumbp256k1.random_scalar() for i in range(10)]
+    expected = [s * P for s in scalars]   # variable base
+    dumbp256k1.register_fixed_base(P)
+    try:
+        for s, Q in zip(scalars, expected):
+            assert s * P == Q
+        assert dumbp256k1.fixed_bases[(P.x, P.y)] is not None
+    finally:
+        del dumbp256k1.fixed_bases[(P.x, P.y)]
+    with pytest.raises(ValueError):
+        dumbp256k1.register_fixed_base(dumbp256k1.Z)
+
+
+def test_wnaf():
+    # digits reconstruct the integer and are non-adjacent
+    for width in range(2, 9):
+        k = secrets.randbelow(dumbp256k1.n)
+        digits = dumbp256k1.wnaf(k, width)
+        assert sum(d << i for i, d in enumerate(digits)) == k
+        for i, d in enumerate(digits):
+            if d != 0:
+                assert d % 2 == 1 and abs(d) < 2 ** (width - 1)
+                assert all(e == 0 for e in digits[i + 1:i + width])
+    # variable base against the fixed-base table for G
+    scalars = [dumbp256k1.Scalar(0), dumbp256k1.Scalar(1), dumbp256k1.Scalar(-1)]
+    scalars += [dumbp256k1.random_scalar() for i in range(5)]
+    for s in scalars:
+        for width in range(2, 9):
+            assert dumbp256k1.scalar_mul(dumbp256k1.G, s, width) == s * dumbp256k1.G
+    assert dumbp256k1.scalar_mul(dumbp256k1.Z, scalars[-1]) == dumbp256k1.Z
+    with pytest.raises(ValueError):
+        dumbp256k1.scalar_mul(dumbp256k1.G, scalars[-1], 1)
+
+
+def test_glv():
+    # the endomorphism acts as multiplication by lambda
+    P = dumbp256k1.endomorphism((dumbp256k1.G.x, dumbp256k1.G.y))
+    assert dumbp256k1.Point(*P) == dumbp256k1.Scalar(dumbp256k1.lam) * dumbp256k1.G
+    # scalar splitting
+    for k in [0, 1, dumbp256k1.n - 1] + [secrets.randbelow(dumbp256k1.n) for i in range(50)]:
+        k1, k2 = dumbp256k1.glv_split(k)
+        assert (k1 + k2 * dumbp256k1.lam - k) % dumbp256k1.n == 0
+        assert abs(k1) < 2 ** 129 and abs(k2) < 2 ** 129
+    # test through test vectors
+    for k, x, y in data:
+        test = dumbp256k1.from_jacobian(dumbp256k1.wnaf_mul((dumbp256k1.G.x, dumbp256k1.G.y), k, 5, True))
+        assert (f'{test.x:064X}', f'{test.y:064X}') == (x, y)
+    # multiexp with and without the endomorphism
+    svector = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(5)])
+    pvector = dumbp256k1.PointVector([dumbp256k1.random_point() for i in range(5)])
+    expected = dumbp256k1.Z
+    for i in range(5):
+        expected += dumbp256k1.scalar_mul(pvector[i], svector[i], split=False)
+    dumbp256k1.glv = False
+    try:
+        assert svector ** pvector == expected
+    finally:
+        dumbp256k1.glv = True
+    assert svector ** pvector == expected
+
+
+def test_pippenger():
+    # empty and all-zero inputs
+    assert dumbp256k1.pippenger([], []) == dumbp256k1.J_INF
+    # signed digits and weighted bucket sums
+    for c in [1, 2, 5, 8]:
+        for k in [0, 1, (1 << c) - 1, dumbp256k1.n - 1, secrets.randbelow(dumbp256k1.n)]:
+            digits = list(dumbp256k1.signed_digits(k, c))
+            assert sum(d << (c * j) for j, d in enumerate(digits)) == k
+            assert all(-(1 << (c - 1)) < d <= 1 << (c - 1) for d in digits)
+    buckets = [dumbp256k1.J_INF] + [dumbp256k1.to_jacobian(dumbp256k1.random_point()) for i in range(4)]
+    expected = sum((dumbp256k1.Scalar(d) * dumbp256k1.from_jacobian(buckets[d]) for d in range(1, 5)), dumbp256k1.Z)
+    assert dumbp256k1.from_jacobian(dumbp256k1.sum_buckets(buckets)) == expected
+    assert dumbp256k1.multiexp(dumbp256k1.ScalarVector([dumbp256k1.Scalar(0)] * 2), dumbp256k1.PointVector([dumbp256k1.G] * 2)) == dumbp256k1.Z
+    # every window width against naive evaluation, including the point at infinity and repeated points
+    points = [dumbp256k1.random_point() for i in range(6)] + [dumbp256k1.Z, dumbp256k1.G, dumbp256k1.G]
+    scalars = [dumbp256k1.random_scalar() for i in range(len(points) - 1)] + [dumbp256k1.Scalar(-1)]
+    expected = dumbp256k1.Z
+    for s, P in zip(scalars, points):
+        expected += s * P
+    for c in range(1, 10):
+        result = dumbp256k1.pippenger([s.x for s in scalars], [(P.x, P.y) for P in points], c)
+        assert dumbp256k1.from_jacobian(result) == expected
+    assert dumbp256k1.ScalarVector(scalars) ** dumbp256k1.PointVector(points) == expected
+
+
+def test_multiexp_dispatch():
+    points = [dumbp256k1.random_point() for i in range(5)] + [dumbp256k1.Z]
+    scalars = [dumbp256k1.random_scalar() for i in range(4)] + [dumbp256k1.Scalar(0), dumbp256k1.Scalar(3)]
+    expected = dumbp256k1.Z
+    for s, P in zip(scalars, points):
+        expected += s * P
+    svector = dumbp256k1.ScalarVector(scalars)
+    pvector = dumbp256k1.PointVector(points)
+    thresholds = (dumbp256k1.multiexp_naive_max, dumbp256k1.multiexp_straus_max)
+    try:
+        for naive_max, straus_max in [(6, 6), (0, 6), (0, 0)]:   # naive, Straus, Pippenger
+            dumbp256k1.multiexp_naive_max = naive_max
+            dumbp256k1.multiexp_straus_max = straus_max
+            assert svector ** pvector == expected
+            assert pvector ** svector == expected
+    finally:
+        dumbp256k1.multiexp_naive_max, dumbp256k1.multiexp_straus_max = thresholds
+    affine = [(P.x, P.y) for P in points]
+    for split in [False, True]:
+        assert dumbp256k1.from_jacobian(dumbp256k1.naive_multiexp([s.x for s in scalars], affine, 4, split)) == expected
+        assert dumbp256k1.from_jacobian(dumbp256k1.straus([s.x for s in scalars], affine, 4, split)) == expected
+
+
+def test_multiexp_context(tmp_path):
+    points = dumbp256k1.PointVector([dumbp256k1.random_point() for i in range(5)] + [dumbp256k1.Z])
+    svector = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(5)] + [dumbp256k1.Scalar(-1)])
+    expected = svector ** points
+    for width in range(1, 10):
+        context = dumbp256k1.MultiexpContext(points, width)
+        assert svector ** context == expected
+        assert context.multiexp(dumbp256k1.ScalarVector([dumbp256k1.Scalar(0)] * 6)) == dumbp256k1.Z
+    context = dumbp256k1.MultiexpContext(points)
+    with pytest.raises(IndexError):
+        context.multiexp(svector[:5])
+    # persistence
+    context.save(tmp_path / 'context.bin')
+    loaded = dumbp256k1.MultiexpContext.load(tmp_path / 'context.bin')
+    assert (loaded.width, len(loaded)) == (context.width, len(context))
+    assert svector ** loaded == expected
+
+
+def test_pointvector_batch():
+    P = dumbp256k1.random_point()
+    Q = dumbp256k1.random_point()
+    # special cases: doubling, inverses and the point at infinity
+    left = dumbp256k1.PointVector([P, P, P, dumbp256k1.Z, P, dumbp256k1.Z])
+    right = dumbp256k1.PointVector([Q, P, -P, Q, dumbp256k1.Z, dumbp256k1.Z])
+    assert (left + right).points == [left[i] + right[i] for i in range(len(left))]
+    assert (left - right).points == [left[i] - right[i] for i in range(len(left))]
+    # products and normalization
+    s = dumbp256k1.random_scalar()
+    svector = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(len(left))])
+    assert (left * s).points == [s * R for R in left.points]
+    assert (svector * left).points == [svector[i] * left[i] for i in range(len(left))]
+    jacobian = [dumbp256k1.jacobian_double(dumbp256k1.to_jacobian(R)) for R in left.points]
+    assert dumbp256k1.PointVector.from_jacobian(jacobian).points == [R + R for R in left.points]
+
+
+def test_vector_storage():
+    scalars = [dumbp256k1.random_scalar() for i in range(4)]
+    svector = dumbp256k1.ScalarVector(scalars)
+    assert svector.xs == [s.x for s in scalars]
+    assert svector.scalars == scalars and svector[1] == scalars[1]
+    assert svector[1:3] == dumbp256k1.ScalarVector(scalars[1:3])
+    svector[0] = dumbp256k1.Scalar(5)
+    svector.append(dumbp256k1.Scalar(6))
+    svector.extend(dumbp256k1.ScalarVector([dumbp256k1.Scalar(7)]))
+    assert svector.xs == [5] + [s.x for s in scalars[1:]] + [6, 7]
+    assert (svector + svector) == svector * dumbp256k1.Scalar(2)
+    assert (svector - svector).sum() == dumbp256k1.Scalar(0)
+    assert -svector == dumbp256k1.ScalarVector([-s for s in svector.scalars])
+    assert svector ** svector == sum((s * s for s in svector.scalars), dumbp256k1.Scalar(0))
+
+    points = [dumbp256k1.random_point() for i in range(3)] + [dumbp256k1.Z]
+    pvector = dumbp256k1.PointVector(points)
+    assert pvector.affine() == [(P.x, P.y) for P in points]
+    assert pvector.points == points and pvector[3] == dumbp256k1.Z
+    assert -pvector == dumbp256k1.PointVector([-P for P in points])
+    pvector[0] = dumbp256k1.G
+    pvector.append(dumbp256k1.G)
+    pvector.extend(pvector[1:2])
+    assert pvector.points == [dumbp256k1.G] + points[1:] + [dumbp256k1.G, points[1]]
+    # any iterable works, including generators
+    assert dumbp256k1.PointVector(P for P in points).points == points
+    assert dumbp256k1.ScalarVector(s for s in scalars).scalars == scalars
+    with pytest.raises(TypeError):
+        dumbp256k1.PointVector(s for s in scalars)
+    # the built-on-demand contents cannot be changed in place
+    with pytest.raises(TypeError):
+        pvector.points.append(dumbp256k1.G)
+    with pytest.raises(TypeError):
+        svector.scalars[0] = dumbp256k1.Scalar(1)
+    assert pvector.points + [dumbp256k1.G] == pvector.points[:] + [dumbp256k1.G]
+    with pytest.raises(TypeError):
+        pvector.append(dumbp256k1.Scalar(1))
+
+
+def test_unchecked():
+    # external inputs are validated, internal results are not unless debugging
+    with pytest.raises(ValueError):
+        dumbp256k1.Point(1, 1)
+    P = dumbp256k1.Point.unchecked(1, 1)
+    assert (P.x, P.y) == (1, 1)
+    with pytest.raises(AttributeError):
+        P.z = 0
+    with pytest.raises(AttributeError):
+        dumbp256k1.Scalar(1).y = 0
+    dumbp256k1.debug = True
+    try:
+        with pytest.raises(ValueError):
+            dumbp256k1.Point.unchecked(1, 1)
+        with pytest.raises(ValueError):
+            dumbp256k1.Scalar.unchecked(dumbp256k1.n)
+        # arithmetic still produces valid results with checking on
+        s = dumbp256k1.random_scalar()
+        Q = dumbp256k1.random_point()
+        assert (s * Q) + Q == (s + dumbp256k1.Scalar(1)) * Q
+        assert dumbp256k1.ScalarVector([s, -s]) ** dumbp256k1.PointVector([Q, Q]) == dumbp256k1.Z
+    finally:
+        dumbp256k1.debug = False
+
+
+def test_binary_encoding(tmp_path):
+    s = dumbp256k1.random_scalar()
+    assert len(s.to_bytes()) == 32
+    assert dumbp256k1.Scalar.from_bytes(s.to_bytes()) == s
+    points = [dumbp256k1.random_point() for i in range(4)] + [dumbp256k1.Z]
+    for P in points:
+        for compressed in [True, False]:
+            assert dumbp256k1.Point.from_bytes(P.to_bytes(compressed)) == P
+    assert dumbp256k1.G.to_bytes().hex() == repr(dumbp256k1.G)
+    assert dumbp256k1.Z.to_bytes() == bytes(1)
+    with pytest.raises(ValueError):
+        dumbp256k1.Point.from_bytes(bytes([4]) + bytes(64))   # not on the curve
+    with pytest.raises(ValueError):
+        dumbp256k1.Point.from_bytes(bytes(32))
+    # scalar encodings are canonical
+    for x in [dumbp256k1.n, 2 ** 256 - 1]:
+        with pytest.raises(ValueError):
+            dumbp256k1.Scalar.from_bytes(x.to_bytes(32, 'big'))
+        with pytest.raises(ValueError):
+            dumbp256k1.ScalarVector.from_bytes(bytes(32) + x.to_bytes(32, 'big'))
+    assert dumbp256k1.Scalar.from_bytes((dumbp256k1.n - 1).to_bytes(32, 'big')) == dumbp256k1.Scalar(-1)
+
+    # vectors, including decoding straight from a memory-mapped file
+    svector = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(5)])
+    pvector = dumbp256k1.PointVector(points)
+    assert dumbp256k1.ScalarVector.from_bytes(memoryview(svector.to_bytes())) == svector
+    for compressed in [True, False]:
+        data = pvector.to_bytes(compressed)
+        assert len(data) == len(points) * (33 if compressed else 65)
+        (tmp_path / 'points.bin').write_bytes(data)
+        with open(tmp_path / 'points.bin', 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                assert dumbp256k1.PointVector.from_bytes(m, compressed) == pvector
+    with pytest.raises(ValueError):
+        dumbp256k1.PointVector.from_bytes(pvector.to_bytes()[:-1])
+
+
+def test_hash_to_point_cache():
+    dumbp256k1.hash_cache.clear()
+    P = dumbp256k1.hash_to_point('label', 1)
+    assert P.y % 2 == 0
+    assert dumbp256k1.hash_to_point('label', 1) == P   # memoized
+    assert dumbp256k1.hash_cache.get(('label', '1')) == (P.x, P.y)
+    # changing a returned Point does not change later results
+    P.x = 5
+    assert dumbp256k1.hash_to_point('label', 1) != P
+    P = dumbp256k1.hash_to_point('label', 1)
+    assert dumbp256k1.hash_to_point('label', 2) != P
+    # deterministic regardless of the cache
+    dumbp256k1.hash_cache.clear()
+    assert dumbp256k1.hash_to_point('label', 1) == P
+    # bounded
+    maxsize = dumbp256k1.hash_cache.maxsize
+    dumbp256k1.hash_cache.maxsize = 2
+    try:
+        for i in range(5):
+            dumbp256k1.hash_to_point('bounded', i)
+        assert len(dumbp256k1.hash_cache) == 2
+    finally:
+        dumbp256k1.hash_cache.maxsize = maxsize
+    with pytest.raises(TypeError):
+        dumbp256k1.hash_to_point(None)
+    # bulk generators
+    gens = dumbp256k1.generators('G', 4)
+    assert gens.points == [dumbp256k1.hash_to_point('G', i) for i in range(4)]
+    gens[0] = dumbp256k1.Z   # callers get their own copy
+    assert dumbp256k1.generators('G', 4)[0] == dumbp256k1.hash_to_point('G', 0)
+
+
+def test_transcript():
+    data = [dumbp256k1.random_scalar(), dumbp256k1.G, dumbp256k1.Z, b'bytes', 'string', -5,
+            dumbp256k1.ScalarVector([dumbp256k1.Scalar(1)]), dumbp256k1.PointVector([dumbp256k1.G])]
+    # deterministic, whether absorbed at once or incrementally
+    first = dumbp256k1.Transcript('test')
+    first.absorb(*data)
+    second = dumbp256k1.Transcript('test')
+    for datum in data:
+        second.absorb(datum)
+    c = first.challenge()
+    assert c == second.challenge()
+    # successive challenges differ, and stay in step
+    assert first.challenge() != c
+    assert first.challenges(3) == second.challenges(4)[1:]
+    # labels and framing matter
+    assert dumbp256k1.Transcript('other').challenge() != dumbp256k1.Transcript('test').challenge()
+    left = dumbp256k1.Transcript()
+    left.absorb('ab', 'c')
+    right = dumbp256k1.Transcript()
+    right.absorb('a', 'bc')
+    assert left.challenge() != right.challenge()
+    # integers are absorbed in binary, distinguishing signs and types
+    integers = [dumbp256k1.Transcript() for i in range(5)]
+    for transcript, datum in zip(integers, [0, -1, 255, -256, '255']):
+        transcript.absorb(datum)
+    assert len({transcript.challenge().x for transcript in integers}) == 5
+    with pytest.raises(TypeError):
+        first.absorb(None)
+
+
+def test_parallel_multiexp():
+    svector = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(7)])
+    pvector = dumbp256k1.PointVector([dumbp256k1.random_point() for i in range(6)] + [dumbp256k1.Z])
+    expected = svector ** pvector
+    # small inputs fall back to serial evaluation
+    assert dumbp256k1.parallel_multiexp(svector, pvector, workers=2) == expected
+    min_size = dumbp256k1.parallel_min_size
+    dumbp256k1.parallel_min_size = 0
+    try:
+        assert dumbp256k1.parallel_multiexp(svector, pvector, workers=2, chunk_size=3) == expected
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            assert dumbp256k1.parallel_multiexp(svector, pvector, chunk_size=2, executor=executor) == expected
+    finally:
+        dumbp256k1.parallel_min_size = min_size
+    with pytest.raises(IndexError):
+        dumbp256k1.parallel_multiexp(svector, pvector[:6])
+
+
+def test_batch_mul():
+    P = dumbp256k1.random_point()
+    scalars = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(6)] + [dumbp256k1.Scalar(0)])
+    points = dumbp256k1.PointVector([P, P, P, dumbp256k1.G, dumbp256k1.G, dumbp256k1.Z, P])
+    expected = [scalars[i] * points[i] for i in range(len(scalars))]
+    assert dumbp256k1.batch_mul(scalars, points).points == expected
+    assert dumbp256k1.batch_mul(scalars, dumbp256k1.G).points == [s * dumbp256k1.G for s in scalars.scalars]
+    # shared tables for repeated bases, and parallel evaluation
+    table_min = dumbp256k1.batch_table_min
+    min_size = dumbp256k1.batch_parallel_min_size
+    dumbp256k1.batch_table_min = 2
+    dumbp256k1.batch_parallel_min_size = 0
+    try:
+        assert dumbp256k1.batch_mul(scalars, points).points == expected
+        assert dumbp256k1.batch_mul(scalars, points, workers=2, chunk_size=4).points == expected
+    finally:
+        dumbp256k1.batch_table_min = table_min
+        dumbp256k1.batch_parallel_min_size = min_size
+    with pytest.raises(IndexError):
+        dumbp256k1.batch_mul(scalars, points[:3])
+
+
+def test_async():
+    svector = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(3)])
+    pvector = dumbp256k1.PointVector([dumbp256k1.random_point() for i in range(3)])
+    s = svector[0]
+    P = pvector[0]
+
+    async def wrappers():
+        assert await dumbp256k1.multiexp_async(svector, pvector) == svector ** pvector
+        assert await dumbp256k1.mul_async(s, P) == s * P
+        dumbp256k1.hash_cache.clear()
+        assert await dumbp256k1.hash_to_point_async('async', 1) == dumbp256k1.hash_to_point('async', 1)
+
+    async def batched():
+        batcher = dumbp256k1.MultiexpBatcher(delay=0.01)
+        cancelled = asyncio.ensure_future(batcher.multiexp(svector, pvector))
+        requests = [batcher.multiexp(svector[:i], pvector[:i]) for i in range(4)]
+        await asyncio.sleep(0)
+        cancelled.cancel()   # before the batch is sent
+        results = await asyncio.gather(*requests)
+        assert results == [svector[:i] ** pvector[:i] for i in range(4)]
+        assert cancelled.cancelled()
+
+    asyncio.run(wrappers())
+    asyncio.run(batched())
+
+
+def test_profile():
+    svector = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(3)])
+    pvector = dumbp256k1.PointVector([dumbp256k1.random_point() for i in range(3)])
+    originals = (dumbp256k1.invert, dumbp256k1.Point.__mul__, dumbp256k1.Scalar.__dict__['unchecked'])
+    with dumbp256k1.Profile() as profile:
+        result = svector ** pvector
+        dumbp256k1.G + dumbp256k1.G
+    assert result == svector ** pvector
+    # a Jacobian multiexp needs one inversion for its tables and one for the result
+    name, seconds, counts = profile.calls[0]
+    assert name == 'multiexp' and seconds > 0
+    assert counts['inversions'] == 2 and counts['doublings'] > 0 and counts['additions'] > 0
+    assert profile.counts['additions'] == counts['additions'] + 1
+    assert len(profile.calls) == 1
+    # everything is restored afterwards
+    assert (dumbp256k1.invert, dumbp256k1.Point.__mul__, dumbp256k1.Scalar.__dict__['unchecked']) == originals
+    with pytest.raises(RuntimeError):
+        profile.stop()
+    # profiles cannot overlap
+    first = dumbp256k1.Profile().start()
+    second = dumbp256k1.Profile()
+    try:
+        with pytest.raises(RuntimeError):
+            second.start()
+        with pytest.raises(RuntimeError):
+            second.stop()
+    finally:
+        first.stop()
+    assert (dumbp256k1.invert, dumbp256k1.Point.__mul__, dumbp256k1.Scalar.__dict__['unchecked']) == originals
+    with second:
+        assert dumbp256k1.active_profile is second
+    assert dumbp256k1.active_profile is None
+
+
+def test_multiexp_stream():
+    svector = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(8)] + [dumbp256k1.Scalar(0)])
+    pvector = dumbp256k1.PointVector([dumbp256k1.random_point() for i in range(7)] + [dumbp256k1.Z, dumbp256k1.G])
+    expected = svector ** pvector
+    assert dumbp256k1.multiexp_stream([]) == dumbp256k1.Z
+    # pairs from a generator, and chunks of vectors
+    pairs = ((svector[i], pvector[i]) for i in range(len(svector)))
+    assert dumbp256k1.multiexp_stream(pairs) == expected
+    chunks = [(svector[i:i + 4], pvector[i:i + 4]) for i in range(0, len(svector), 4)]
+    for c in [1, 3, 8]:
+        assert dumbp256k1.multiexp_stream(chunks, c) == expected
+    assert dumbp256k1.multiexp_stream(chunks, size_hint=len(svector)) == expected
+    dumbp256k1.glv = False
+    try:
+        assert dumbp256k1.multiexp_stream(chunks) == expected
+    finally:
+        dumbp256k1.glv = True
+    with pytest.raises(TypeError):
+        dumbp256k1.multiexp_stream([(svector, pvector[0])])
+
+
+def test_pointvector_sum():
+    assert dumbp256k1.PointVector().sum() == dumbp256k1.Z
+    P = dumbp256k1.random_point()
+    # doublings, cancellation and the point at infinity inside the tree
+    vectors = [
+        dumbp256k1.PointVector([P]),
+        dumbp256k1.PointVector([P, P, P, -P, dumbp256k1.Z]),
+        dumbp256k1.PointVector([dumbp256k1.random_point() for i in range(7)]),
+        dumbp256k1.PointVector(),
+    ]
+    expected = []
+    for W in vectors:
+        total = dumbp256k1.Z
+        for Q in W.points:
+            total += Q
+        assert W.sum() == total
+        expected.append(total)
+    assert dumbp256k1.point_sums(*vectors).points == expected
+    with dumbp256k1.Profile() as profile:
+        dumbp256k1.point_sums(*vectors)
+    assert profile.counts['inversions'] == 3   # tree depth of the longest vector
+
+
+def test_scalar_powers():
+    x = dumbp256k1.random_scalar()
+    assert x ** 0 == dumbp256k1.Scalar(1)
+    assert x ** 3 == x * x * x
+    assert x ** (dumbp256k1.n - 1) == dumbp256k1.Scalar(1)   # Fermat
+    powers = dumbp256k1.ScalarVector.powers(x, 5)
+    assert powers == dumbp256k1.ScalarVector([x ** i for i in range(5)])
+    assert len(dumbp256k1.ScalarVector.powers(x, 0)) == 0
+    # polynomial evaluation agrees with the inner product against the power vector
+    coefficients = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(5)])
+    assert coefficients.evaluate(x) == coefficients ** powers
+    assert dumbp256k1.ScalarVector().evaluate(x) == dumbp256k1.Scalar(0)
+    xs = dumbp256k1.ScalarVector([x, dumbp256k1.Scalar(0), dumbp256k1.Scalar(1)])
+    assert coefficients.evaluate_many(xs) == dumbp256k1.ScalarVector([coefficients.evaluate(y) for y in xs.scalars])
+
+
+def test_precomputation_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(dumbp256k1, 'fixed_bases', dict(dumbp256k1.fixed_bases))
+    monkeypatch.setattr(dumbp256k1, 'generator_cache', dumbp256k1.LRUCache(16))
+    monkeypatch.setattr(dumbp256k1, 'precomputation_cache', None)
+    P = dumbp256k1.random_point()
+    dumbp256k1.register_fixed_base(P)
+    tables = {Q: dumbp256k1.fixed_base_table(Q) for Q in dumbp256k1.fixed_bases}
+    W = dumbp256k1.generators('cache', 5)
+    path = tmp_path / 'precomputed.bin'
+    dumbp256k1.save_cache(path, [('other', 3)])
+
+    # a fresh process state reads everything from the cache
+    for Q in tables:
+        dumbp256k1.fixed_bases[Q] = None
+    dumbp256k1.generator_cache.clear()
+    cache = dumbp256k1.load_cache(path)
+    assert len(cache) == len(tables) + 2
+    assert dumbp256k1.fixed_base_table(P) == tables[(P.x, P.y)]
+    assert dumbp256k1.generators('cache', 5) == W
+    assert dumbp256k1.generators('other', 3) == dumbp256k1.PointVector([dumbp256k1.hash_to_point('other', i) for i in range(3)])
+    assert cache.generators('cache', 4) is None
+    s = dumbp256k1.random_scalar()
+    assert P * s == dumbp256k1.scalar_mul(P, s)
+
+    # saving again keeps entries of the cache in use
+    dumbp256k1.generator_cache.clear()
+    dumbp256k1.save_cache(path)
+    assert len(dumbp256k1.load_cache(path)) == len(tables) + 2
+    assert dumbp256k1.load_cache(None) is None
+    cache.close()
+
+    # stale tables are ignored and rebuilt, whether the first entry or the start of a later row is wrong
+    offset = cache.entries[(dumbp256k1.cache_table_kind, P.to_bytes())][1]
+    half = 1 << (dumbp256k1.fixed_base_width - 1)
+    original = path.read_bytes()
+    for entry in [0, 1, 3 * half]:
+        data = bytearray(original)
+        data[offset + 65 * entry:offset + 65 * (entry + 1)] = dumbp256k1.G.to_bytes(compressed=False)
+        path.write_bytes(bytes(data))
+        dumbp256k1.load_cache(path)
+        dumbp256k1.fixed_bases[(P.x, P.y)] = None
+        assert dumbp256k1.fixed_base_table(P) == tables[(P.x, P.y)]
+
+    # other versions and truncated files are rejected, but do not stop the module from importing
+    header = dumbp256k1.cache_magic + (1).to_bytes(4, 'big') + (1).to_bytes(4, 'big')
+    bumped = bytearray(original)
+    bumped[11] += 1
+    for data in [bytes(bumped), header, header + bytes([ord('T'), 0, 33]) + bytes(40)]:
+        path.write_bytes(data)
+        with pytest.raises(ValueError):
+            dumbp256k1.load_cache(path)
+        environment = dict(os.environ, DUMBP256K1_CACHE=str(path))
+        code = 'import dumbp256k1; assert dumbp256k1.precomputation_cache is None; assert dumbp256k1.G * dumbp256k1.Scalar(1) == dumbp256k1.G'
+        subprocess.run([sys.executable, '-c', code], env=environment, cwd=os.path.dirname(dumbp256k1.__file__), check=True)
+
+
+def test_backend():
+    assert dumbp256k1.backend in dumbp256k1.backends
+    original = dumbp256k1.backend
+    a = dumbp256k1.random_scalar().x
+    try:
+        for name in dumbp256k1.backends:
+            dumbp256k1.set_backend(name)
+            assert dumbp256k1.invert(a, dumbp256k1.p) * a % dumbp256k1.p == 1
+            assert dumbp256k1.invert(-a, dumbp256k1.n) == dumbp256k1.n - dumbp256k1.invert(a, dumbp256k1.n)
+            for zero in [0, dumbp256k1.p]:
+                with pytest.raises(ZeroDivisionError):
+                    dumbp256k1.invert(zero, dumbp256k1.p)
+            assert dumbp256k1.Point(dumbp256k1.G.to_bytes().hex()) == dumbp256k1.G
+            P = dumbp256k1.random_point()
+            assert dumbp256k1.Point.from_bytes(P.to_bytes()) == P
+            assert dumbp256k1.Point(P.x, P.y) * dumbp256k1.Scalar(3) == P + P + P
+        with pytest.raises(ValueError):
+            dumbp256k1.set_backend('missing')
+    finally:
+        dumbp256k1.set_backend(original)
+
+
+def test_batch_verify():
+    bases = dumbp256k1.generators('batch', 8)
+    equations = []
+    for i in range(12):
+        length = secrets.randbelow(8) + 1
+        svector = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for j in range(length)])
+        pvector = bases[:length] if i % 2 else dumbp256k1.PointVector([dumbp256k1.random_point() for j in range(length)])
+        equations.append((svector, pvector, svector ** pvector))
+    equations.append((dumbp256k1.ScalarVector([dumbp256k1.Scalar(1)]), dumbp256k1.PointVector([dumbp256k1.Z]), dumbp256k1.Z))
+    equations.append((dumbp256k1.ScalarVector(), dumbp256k1.PointVector(), dumbp256k1.Z))
+    assert dumbp256k1.batch_verify(equations)
+    assert dumbp256k1.batch_verify(equations, locate=True) == []
+    assert dumbp256k1.batch_verify([])
+
+    # false equations are found
+    for i in [3, 4, 13]:
+        svector, pvector, result = equations[i]
+        equations[i] = (svector, pvector, result + dumbp256k1.G)
+    assert not dumbp256k1.batch_verify(equations)
+    assert dumbp256k1.batch_verify(equations, locate=True) == [3, 4, 13]
+
+    with pytest.raises(IndexError):
+        dumbp256k1.batch_verify([(dumbp256k1.ScalarVector(), bases, dumbp256k1.Z)])
+    with pytest.raises(TypeError):
+        dumbp256k1.batch_verify([(bases, bases, dumbp256k1.Z)])
+
+
+def test_lazy(monkeypatch):
+    length = 6
+    pvector = dumbp256k1.PointVector([dumbp256k1.random_point() for i in range(length - 1)] + [dumbp256k1.Z])
+    qvector = dumbp256k1.PointVector([dumbp256k1.random_point() for i in range(length)])
+    svector1 = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(length)])
+    svector2 = dumbp256k1.ScalarVector([dumbp256k1.random_scalar() for i in range(length)])
+    s = dumbp256k1.random_scalar()
+    expected = [svector1 ** (svector2 * pvector), svector1 ** (pvector * s), (svector2 * pvector + qvector * s - pvector) * svector1]
+
+    expected_first = pvector[0] * s
+    monkeypatch.setattr(dumbp256k1, 'lazy', True)
+    hadamard = svector2 * pvector
+    assert isinstance(hadamard, dumbp256k1.LazyPointVector)
+    assert svector1 ** hadamard == expected[0]
+    assert svector1 ** (pvector * s) == expected[1]
+    combined = (hadamard + qvector * s - pvector) * svector1
+    assert combined == expected[2]
+    assert [combined[i] for i in range(length)] == expected[2].points
+    assert combined[1:3] == expected[2][1:3]
+    assert combined.sum() == expected[2].sum()
+    assert (qvector - combined) + combined == qvector
+    assert -hadamard == -(svector2 * pvector).evaluate()
+    # common bases are merged before the multiexp
+    assert (pvector * s - pvector * s) ** svector1 == dumbp256k1.Z
+    with pytest.raises(TypeError):
+        pvector * svector1[:2]
+
+    # a lazy vector works wherever a PointVector does
+    eager = expected[2]
+    combined = (svector2 * pvector + qvector * s - pvector) * svector1
+    assert eager == combined and not eager != combined
+    assert combined.xs == eager.xs and combined.affine() == eager.affine()
+    assert combined.to_bytes() == eager.to_bytes() and repr(combined) == repr(eager)
+    assert dumbp256k1.multiexp(svector1, combined) == svector1 ** eager
+    assert dumbp256k1.parallel_multiexp(svector1, combined, workers=1) == svector1 ** eager
+    assert dumbp256k1.MultiexpContext(combined).multiexp(svector1) == svector1 ** eager
+    assert dumbp256k1.batch_verify([(svector1, combined, svector1 ** eager)])
+    assert dumbp256k1.point_sums(combined, eager) == dumbp256k1.PointVector([eager.sum()] * 2)
+    first = dumbp256k1.Transcript('lazy')
+    first.absorb(combined)
+    second = dumbp256k1.Transcript('lazy')
+    second.absorb(eager)
+    assert first.challenge() == second.challenge()
+    extended = dumbp256k1.PointVector()
+    extended.extend(combined)
+    assert extended == eager
+    # in-place changes, on a lazy vector or on the inputs of one
+    lazy = pvector * s
+    pvector[0] = dumbp256k1.G
+    assert lazy[0] == expected_first
+    lazy[1] = dumbp256k1.G
+    lazy.append(dumbp256k1.G)
+    assert lazy.points[1:] == [dumbp256k1.G] + (pvector * s).points[2:] + [dumbp256k1.G]
+    assert lazy ** dumbp256k1.ScalarVector([dumbp256k1.Scalar(1)] * (length + 1)) == lazy.evaluate().sum()